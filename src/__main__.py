@@ -5,32 +5,58 @@ Handles both development (polling) and production (webhook) modes.
 """
 
 import os
-import asyncio
 import logging
-from telegram_bot import main
+from typing import Literal
+from async_agent import AsyncRealEstateAgent
+from config import setup_logging
+from telegram_bot import main, run
 
 # Configure logging for production
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
-if __name__ == "__main__":
-    # Check if we're running in production (Railway sets PORT environment variable)
+
+def _select_mode() -> Literal["webhook", "polling"]:
+    """Pick webhook mode whenever a public URL is available; polling is the dev opt-in.
+    USE_WEBHOOK=1/0 overrides the detection for non-Railway deploys."""
     port = os.getenv('PORT')
-    if port:
-        logger.info(f"Production mode detected (PORT={port})")
-        # Set webhook URL based on Railway's domain
-        railway_domain = os.getenv('RAILWAY_PUBLIC_DOMAIN')
-        if railway_domain:
-            webhook_url = f"https://{railway_domain}/webhook"
-            os.environ['TELEGRAM_WEBHOOK_URL'] = webhook_url
-            os.environ['TELEGRAM_WEBHOOK_PORT'] = port
-            logger.info(f"Setting webhook URL to: {webhook_url}")
+    railway_domain = os.getenv('RAILWAY_PUBLIC_DOMAIN')
+    
+    # Derive the webhook URL from Railway's domain (Railway sets PORT in production)
+    if port and railway_domain and not os.getenv('TELEGRAM_WEBHOOK_URL'):
+        webhook_url = f"https://{railway_domain}/webhook"
+        os.environ['TELEGRAM_WEBHOOK_URL'] = webhook_url
+        os.environ['TELEGRAM_WEBHOOK_PORT'] = port
+        logger.info(f"Setting webhook URL to: {webhook_url}")
+    
+    use_webhook = os.getenv('USE_WEBHOOK')
+    if use_webhook is not None:
+        return "webhook" if use_webhook.strip().lower() in ('1', 'true', 'yes') else "polling"
+    
+    return "webhook" if os.getenv('TELEGRAM_WEBHOOK_URL') else "polling"
+
+
+async def _run(mode: str):
+    """Preload the agent before the bot starts accepting messages, then run the bot"""
+    agent = AsyncRealEstateAgent()
+    await agent.initialize()
+    logger.info("Agent preloaded")
+    
+    # WARMUP=1 runs one throwaway query to open LM/search connections before the first user
+    if os.getenv('WARMUP', '').strip().lower() in ('1', 'true', 'yes'):
+        result = await agent.get_quick_estimate("123 Main St")
+        logger.info(f"Warmup query finished (success={result['success']})")
+    
+    await main(mode=mode, agent=agent)
+
+
+if __name__ == "__main__":
+    mode = _select_mode()
+    if mode == "webhook":
+        logger.info("Production mode detected (using webhook)")
     else:
         logger.info("Development mode detected (using polling)")
     
     # Run the bot
-    asyncio.run(main())
\ No newline at end of file
+    run(_run(mode))
\ No newline at end of file
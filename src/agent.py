@@ -3,6 +3,11 @@ Agent creation and management for DSPy real estate agent.
 Contains functions to create and configure the ReAct agent with all tools.
 """
 
+import functools
+import io
+import logging
+import sys
+
 import dspy
 from dspy import Tool
 
@@ -17,41 +22,51 @@ from tools import (
     get_comparable_sales
 )
 
+logger = logging.getLogger(__name__)
+
+
+# Tool wrappers are built once; DSPy introspects each function's signature on construction
+_TOOLS = (
+    Tool(web_search),
+    Tool(get_current_time),
+    Tool(get_property_tax_data),
+    Tool(get_neighborhood_stats),
+    Tool(get_school_ratings),
+    Tool(get_crime_data),
+    Tool(get_comparable_sales)
+)
+
 
+@functools.lru_cache(maxsize=1)
 def create_real_estate_agent():
-    """Create and return a configured ReAct agent for real estate valuation"""
-    agent = dspy.ReAct(
-        DSPyRealEstateAgent,
-        tools=[
-            Tool(web_search),
-            Tool(get_current_time),
-            Tool(get_property_tax_data),
-            Tool(get_neighborhood_stats),
-            Tool(get_school_ratings),
-            Tool(get_crime_data),
-            Tool(get_comparable_sales)
-        ],
-    )
-    return agent
+    """Create and return the shared ReAct agent for real estate valuation.
+
+    The agent holds no per-call state, so one instance is safe to share
+    across threads and repeated calls return it instead of rebuilding.
+    """
+    return dspy.ReAct(DSPyRealEstateAgent, tools=list(_TOOLS))
+
+
+# (heading, prediction field) pairs in display order
+_RESULT_SECTIONS = (
+    ("PROPERTY DETAILS", "property_details"),
+    ("COMPARABLE SALES", "comparable_sales"),
+    ("NEIGHBORHOOD ANALYSIS", "neighborhood_analysis"),
+    ("MARKET ADJUSTMENTS", "market_adjustments"),
+    ("PRICE ANALYSIS", "price_analysis"),
+    ("PRICE RANGE", "price_range"),
+    ("FINAL ESTIMATE", "final_estimate"),
+)
 
 
 def display_results(prediction):
     """Display formatted results from the agent prediction"""
-    print("\n" + "="*50)
-    print("           PROPERTY VALUATION RESULTS")
-    print("="*50)
-    print("\n=== PROPERTY DETAILS ===")
-    print(prediction.property_details)
-    print("\n=== COMPARABLE SALES ===")
-    print(prediction.comparable_sales)
-    print("\n=== NEIGHBORHOOD ANALYSIS ===")
-    print(prediction.neighborhood_analysis)
-    print("\n=== MARKET ADJUSTMENTS ===")
-    print(prediction.market_adjustments)
-    print("\n=== PRICE ANALYSIS ===")
-    print(prediction.price_analysis)
-    print("\n=== PRICE RANGE ===")
-    print(prediction.price_range)
-    print("\n=== FINAL ESTIMATE ===")
-    print(prediction.final_estimate)
-    print(f"\n=== CONFIDENCE: {prediction.confidence} ===")
\ No newline at end of file
+    # Build the whole report and write it once, instead of one locked print per line
+    buf = io.StringIO()
+    w = buf.write
+    w("\n" + "=" * 50 + "\n           PROPERTY VALUATION RESULTS\n" + "=" * 50)
+    for label, attr in _RESULT_SECTIONS:
+        w(f"\n\n=== {label} ===\n{getattr(prediction, attr)}")
+    w(f"\n\n=== CONFIDENCE: {prediction.confidence} ===\n")
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
@@ -4,36 +4,60 @@ Provides async interface for use with Telegram bot with caching support.
 """
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Optional
+from typing import Any, Dict, Optional, Sequence, Tuple
 import logging
+import dspy
 from config import setup_dspy, get_cache_config
+from executor import run_sync
+from batcher import QuestionBatcher
 from agent import create_real_estate_agent
+from tools import (
+    get_property_tax_data, get_neighborhood_stats, get_school_ratings,
+    get_crime_data, get_comparable_sales, prewarm_signals, track_skipped_searches, with_search_scope
+)
 from message_parser import PropertyQuery
 from cache_manager import PropertyCache
 
 logger = logging.getLogger(__name__)
 
+# How long a failed quick estimate is remembered before the agent is retried
+NEGATIVE_CACHE_TTL_SECONDS = 300
+
+# Search-backed tools the valuation agent nearly always calls with each address
+_PREWARM_TOOLS = (
+    get_property_tax_data,
+    get_neighborhood_stats,
+    get_school_ratings,
+    get_crime_data,
+    get_comparable_sales
+)
+
 
 class AsyncRealEstateAgent:
     """Async wrapper for the DSPy real estate agent with caching"""
     
     def __init__(self):
-        self.executor = ThreadPoolExecutor(max_workers=2)
         self.agent = None
+        self.async_agent = None
         self._setup_complete = False
         
+        # In-flight agent runs keyed by query, so concurrent duplicates share one run
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Questions from concurrent users are dispatched together in short windows
+        self.batcher = QuestionBatcher(self._ask)
+        
         # Initialize cache
         cache_config = get_cache_config()
-        self.cache_enabled = cache_config['enable_cache']
+        self.cache_enabled = cache_config.enable_cache
         
         if self.cache_enabled:
             self.cache = PropertyCache(
-                max_memory_items=cache_config['memory_max_items'],
-                memory_ttl_hours=cache_config['memory_ttl_hours'],
-                disk_cache_dir=cache_config['disk_cache_dir'],
-                disk_ttl_days=cache_config['disk_ttl_days'],
-                enable_disk_cache=cache_config['enable_disk_cache']
+                max_memory_items=cache_config.memory_max_items,
+                memory_ttl_hours=cache_config.memory_ttl_hours,
+                disk_cache_dir=cache_config.disk_cache_dir,
+                disk_ttl_days=cache_config.disk_ttl_days,
+                enable_disk_cache=cache_config.enable_disk_cache
             )
             logger.info("Cache enabled for AsyncRealEstateAgent")
         else:
@@ -43,14 +67,28 @@ class AsyncRealEstateAgent:
     async def initialize(self):
         """Initialize the agent asynchronously"""
         if not self._setup_complete:
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(self.executor, self._sync_setup)
+            await run_sync(self._sync_setup)
             self._setup_complete = True
     
     def _sync_setup(self):
         """Synchronous setup method"""
         setup_dspy()
+        # Shared process-wide instance; ReAct keeps its trajectory per call, so concurrent runs are safe
         self.agent = create_real_estate_agent()
+        self.async_agent = dspy.asyncify(with_search_scope(self._run_agent))
+    
+    def _run_agent(self, question: str, addresses: Sequence[str] = ()) -> Tuple[Any, bool]:
+        """Run the agent with each address's searches fetched in one concurrent wave first,
+        so its tool calls hit the search scope instead of searching one tool at a time.
+        Returns (prediction, whether any search was skipped by the search circuit breaker)."""
+        with track_skipped_searches() as skipped:
+            prewarm_signals(addresses, _PREWARM_TOOLS)
+            prediction = self.agent(question=question)
+        return prediction, skipped.is_set()
+    
+    async def _ask(self, question: str, addresses: Sequence[str] = ()) -> Tuple[Any, bool]:
+        """Run a single question through the agent, (prediction, searches skipped)"""
+        return await self.async_agent(question=question, addresses=addresses)
     
     async def analyze_property(self, query: PropertyQuery) -> Any:
         """Analyze property valuation asynchronously with caching"""
@@ -63,9 +101,11 @@ class AsyncRealEstateAgent:
             'query_type': query.query_type
         }
         
-        # Check cache first
+        # Check cache first; disk reads are blocking file I/O, so run them off the loop
         if self.cache_enabled and self.cache:
-            cached_result = self.cache.get(cache_data)
+            cached_result = self.cache.get_memory(cache_data)
+            if cached_result is None:
+                cached_result = await run_sync(self.cache.get_disk, cache_data)
             if cached_result is not None:
                 logger.info(f"Cache hit for query: {query.addresses}")
                 return cached_result
@@ -73,60 +113,80 @@ class AsyncRealEstateAgent:
         # Prepare the question based on query type
         question = self._build_question(query)
         
-        # Run the agent in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        prediction = await loop.run_in_executor(
-            self.executor, 
-            self._run_agent_sync, 
-            question
-        )
+        # Join an identical request that is already running instead of starting another.
+        # There is no await between the lookup and the registration, so this is race-free.
+        inflight_key = self.cache._generate_cache_key(cache_data) if self.cache else question
+        pending = self._inflight.get(inflight_key)
+        if pending is not None:
+            logger.info(f"Joining in-flight analysis for query: {query.addresses}")
+            return await asyncio.shield(pending)
         
-        # Cache the result
-        if self.cache_enabled and self.cache:
-            self.cache.set(cache_data, prediction)
-            logger.info(f"Cached result for query: {query.addresses}")
-        
-        return prediction
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        try:
+            prediction, searches_skipped = await self.batcher.submit(question, query.addresses)
+            
+            # Cache the result; the disk write runs in the background on the shared pool.
+            # An answer made while searches were skipped lacks data, so it is only kept briefly.
+            if self.cache_enabled and self.cache:
+                ttl = NEGATIVE_CACHE_TTL_SECONDS if searches_skipped else None
+                self.cache.set_memory(cache_data, prediction, ttl)
+                if self.cache.enable_disk_cache:
+                    run_sync(self.cache.set_disk, cache_data, prediction, ttl)
+                logger.info(f"Cached result for query: {query.addresses}")
+            
+            future.set_result(prediction)
+            return prediction
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so unjoined failures aren't logged twice
+            raise
+        finally:
+            del self._inflight[inflight_key]
     
-    def _run_agent_sync(self, question: str) -> Any:
-        """Run the agent synchronously"""
-        return self.agent(question=question)
+    # Question templates keyed by (query_type, address count)
+    _TEMPLATES = {
+        ("multiple", 2): ("If I want to sell two houses {a[0]} and {a[1]}, what is the estimated "
+                          "price of the two houses when selling them together?"),
+        ("compare", 2): ("Compare the estimated values of {a[0]} and {a[1]}. What are their "
+                         "individual values and how do they differ?"),
+    }
     
     def _build_question(self, query: PropertyQuery) -> str:
         """Build the appropriate question based on query type"""
-        if query.query_type == "multiple" and len(query.addresses) == 2:
-            # Adjacent properties
-            return (f"If I want to sell two houses {query.addresses[0]} and "
-                   f"{query.addresses[1]}, what is the estimated price of the "
-                   f"two houses when selling them together?")
-        
-        elif query.query_type == "compare" and len(query.addresses) >= 2:
-            # Comparison
-            return (f"Compare the estimated values of {query.addresses[0]} "
-                   f"and {query.addresses[1]}. What are their individual values "
-                   f"and how do they differ?")
-        
-        elif len(query.addresses) >= 1:
-            # Single property
-            return f"What is the estimated price of {query.addresses[0]} today?"
+        addresses = query.addresses
+        # Comparisons use the first two addresses however many were given
+        count = min(len(addresses), 2) if query.query_type == "compare" else len(addresses)
         
-        else:
-            return "I need a valid property address to provide an estimate."
+        template = self._TEMPLATES.get((query.query_type, count))
+        if template:
+            return template.format(a=addresses)
+        if addresses:
+            return f"What is the estimated price of {addresses[0]} today?"
+        return "I need a valid property address to provide an estimate."
     
     async def get_quick_estimate(self, address: str) -> dict:
         """Get a quick estimate for a single property"""
+        cache_data = {'addresses': [address], 'query_type': 'quick'}
         try:
+            # A recent failure for this address is served from the negative cache until it expires
+            if self.cache_enabled and self.cache:
+                failure = self.cache.get_memory(cache_data)
+                if failure is None:
+                    failure = await run_sync(self.cache.get_disk, cache_data)
+                if failure is not None:
+                    logger.info(f"Negative cache hit for address: {address}")
+                    return self._failed_estimate(address, failure['error'])
+            
             if not self._setup_complete:
                 await self.initialize()
             
             question = f"What is the estimated price of {address} today?"
             
-            loop = asyncio.get_event_loop()
-            prediction = await loop.run_in_executor(
-                self.executor,
-                self._run_agent_sync,
-                question
-            )
+            prediction, _ = await self.batcher.submit(question, [address])
             
             # Extract key information for quick response
             return {
@@ -137,13 +197,23 @@ class AsyncRealEstateAgent:
             }
             
         except Exception as e:
-            return {
-                "address": address,
-                "estimate": "Analysis failed",
-                "confidence": 0.0,
-                "success": False,
-                "error": str(e)
-            }
+            # Remember the failure briefly so repeat requests don't re-run a doomed query
+            if self.cache_enabled and self.cache:
+                failure = {"success": False, "error": str(e)}
+                self.cache.set_memory(cache_data, failure, ttl_override_seconds=NEGATIVE_CACHE_TTL_SECONDS)
+                if self.cache.enable_disk_cache:
+                    run_sync(self.cache.set_disk, cache_data, failure, NEGATIVE_CACHE_TTL_SECONDS)
+            return self._failed_estimate(address, str(e))
+    
+    def _failed_estimate(self, address: str, error: str) -> dict:
+        """Quick-estimate response for a failed analysis"""
+        return {
+            "address": address,
+            "estimate": "Analysis failed",
+            "confidence": 0.0,
+            "success": False,
+            "error": error
+        }
     
     async def health_check(self) -> bool:
         """Check if the agent is healthy and responding"""
@@ -157,7 +227,7 @@ class AsyncRealEstateAgent:
     def get_cache_stats(self) -> dict:
         """Get cache statistics"""
         if self.cache_enabled and self.cache:
-            return self.cache.get_cache_info()
+            return {"cache_enabled": True, **self.cache.get_cache_info()}
         return {"cache_enabled": False}
     
     def clear_cache(self) -> dict:
@@ -179,5 +249,5 @@ class AsyncRealEstateAgent:
         return {"invalidated": 0, "reason": "Cache not enabled"}
     
     def cleanup(self):
-        """Cleanup resources"""
-        self.executor.shutdown(wait=False)
\ No newline at end of file
+        """Cleanup resources (the shared executor is shut down at interpreter exit)"""
+        self.batcher.close()
\ No newline at end of file
@@ -0,0 +1,100 @@
+"""
+Micro-batching for agent questions.
+Collects questions that arrive within a short window and dispatches them
+together. Off by default: dispatched questions still run as independent
+concurrent calls, so the window only adds latency unless BATCH_WINDOW_MS
+is set for a backend that gains from grouped arrivals.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionBatcher:
+    """Queue questions and run them in windows of up to max_batch concurrent calls"""
+
+    def __init__(
+        self,
+        run: Callable[..., Awaitable[Any]],
+        window_ms: Optional[int] = None,
+        max_batch: Optional[int] = None
+    ):
+        self._run = run
+        self.window = (window_ms if window_ms is not None else int(os.getenv('BATCH_WINDOW_MS', '0'))) / 1000
+        self.max_batch = max_batch or int(os.getenv('MAX_BATCH', '8'))
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Running batches; the loop only keeps weak references to tasks
+        self._batches: Set[asyncio.Task] = set()
+
+    async def submit(self, question: str, *args: Any) -> Any:
+        """Queue a question and wait for its result; extra args are passed through to run"""
+        if self.window <= 0:
+            return await self._run(question, *args)  # Batching disabled
+        
+        loop = asyncio.get_running_loop()
+
+        # (Re)start the dispatcher on first use or if the event loop changed
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._dispatch_loop())
+
+        future = loop.create_future()
+        await self._queue.put(((question, *args), future))
+        return await future
+
+    async def _dispatch_loop(self):
+        """Gather queued questions into batches and hand each batch off"""
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            logger.debug(f"Dispatching batch of {len(batch)} questions")
+            # Don't block the next window on this batch finishing
+            task = loop.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    def close(self):
+        """Stop the dispatcher and cancel questions still waiting for a batch.
+        Batches already dispatched run to completion."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                future.cancel()
+
+    async def _dispatch(self, batch: List[Tuple[tuple, asyncio.Future]]):
+        """Run a batch concurrently and resolve each caller's future"""
+        results = await asyncio.gather(
+            *[self._run(*call) for call, _ in batch],
+            return_exceptions=True
+        )
+
+        for (_, future), result in zip(batch, results):
+            if future.done():  # Caller gave up waiting
+                continue
+            if isinstance(result, asyncio.CancelledError):
+                future.cancel()
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -3,17 +3,99 @@ Caching system for DSPy real estate agent.
 Provides both in-memory and persistent caching for property valuations.
 """
 
+import functools
 import hashlib
 import json
+import os
+import re
 import time
-import pickle
-from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, Tuple
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Optional, Tuple
 from pathlib import Path
 import logging
 
+try:
+    import xxhash
+except ImportError:  # Optional speedup; stdlib blake2b is used otherwise
+    xxhash = None
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used otherwise
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Street suffix abbreviations applied during address normalization
+_SUFFIX_MAP = {
+    ' street': ' st',
+    ' avenue': ' ave',
+    ' road': ' rd',
+    ' drive': ' dr',
+    ' lane': ' ln',
+    ' court': ' ct',
+    ' place': ' pl',
+}
+_SUFFIX_RE = re.compile('|'.join(re.escape(k) for k in _SUFFIX_MAP))
+_WS_RE = re.compile(r'\s+')
+
+# Valuation fields persisted for DSPy predictions
+_PREDICTION_FIELDS = (
+    'property_details', 'comparable_sales', 'neighborhood_analysis', 'market_adjustments',
+    'price_analysis', 'price_range', 'final_estimate', 'confidence'
+)
+
+
+def _hash_key(data: str) -> str:
+    """Hash a canonical key string to a 32-char hex digest (non-cryptographic use)"""
+    encoded = data.encode()
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(encoded)
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _dumps(data: Any) -> bytes:
+    """Serialize to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(data, default=str)
+    return json.dumps(data, default=str).encode()
+
+
+def _loads(blob: bytes) -> Any:
+    """Deserialize JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(blob)
+    return json.loads(blob)
+
+
+def _serialize_result(result: Any) -> Dict[str, Any]:
+    """Convert a cached result to JSON-safe data; predictions keep only valuation fields"""
+    if isinstance(result, dict):
+        return {'kind': 'dict', 'data': result}
+    return {
+        'kind': 'prediction',
+        'data': {k: getattr(result, k) for k in _PREDICTION_FIELDS if hasattr(result, k)}
+    }
+
+
+def _deserialize_result(payload: Dict[str, Any]) -> Any:
+    """Rebuild a cached result; predictions come back as attribute-access namespaces"""
+    if payload['kind'] == 'prediction':
+        return SimpleNamespace(**payload['data'])
+    return payload['data']
+
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_address(address: str) -> str:
+    """Normalize address string for consistent caching (memoized, addresses recur)"""
+    addr = address.lower().strip()
+    addr = _SUFFIX_RE.sub(lambda m: _SUFFIX_MAP[m.group(0)], addr)
+    return _WS_RE.sub(' ', addr)
+
 
 class CacheStats:
     """Statistics for cache performance"""
@@ -61,31 +143,72 @@ class PropertyCache:
         enable_disk_cache: bool = True
     ):
         self.max_memory_items = max_memory_items
-        self.memory_ttl = timedelta(hours=memory_ttl_hours)
-        self.disk_ttl = timedelta(days=disk_ttl_days)
+        self.memory_ttl_seconds = memory_ttl_hours * 3600
+        self.disk_ttl_seconds = disk_ttl_days * 86400
         self.enable_disk_cache = enable_disk_cache
         
-        # In-memory cache: {cache_key: (data, timestamp, access_count)}
-        self._memory_cache: Dict[str, Tuple[Any, datetime, int]] = {}
+        # In-memory LRU cache: {cache_key: (data, monotonic_expiry)}, least recently used first
+        self._memory_cache: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        # Disk lookups may promote entries from worker threads
+        self._memory_lock = threading.RLock()
         
         # Disk cache directory
         self.disk_cache_dir = Path(disk_cache_dir)
         if self.enable_disk_cache:
             self.disk_cache_dir.mkdir(exist_ok=True)
         
+        # Disk tier is a single SQLite database; one shared connection, serialized by a lock
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if self.enable_disk_cache:
+            self._db = sqlite3.connect(
+                str(self.disk_cache_dir / "cache.db"), check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache("
+                "key TEXT PRIMARY KEY, blob BLOB, expiry REAL, addresses TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache(expiry)")
+            self._db.commit()
+        
         # Statistics
         self.stats = CacheStats()
         
         logger.info(f"Cache initialized: memory={max_memory_items}, disk={enable_disk_cache}")
     
+    @classmethod
+    def from_config(cls, cache_config, subdir: Optional[str] = None) -> "PropertyCache":
+        """Build a cache from a CacheConfig, optionally in its own subdirectory of the disk cache"""
+        disk_cache_dir = cache_config.disk_cache_dir
+        if subdir:
+            disk_cache_dir = os.path.join(disk_cache_dir, subdir)
+            if cache_config.enable_disk_cache:
+                os.makedirs(disk_cache_dir, exist_ok=True)
+        
+        return cls(
+            max_memory_items=cache_config.memory_max_items,
+            memory_ttl_hours=cache_config.memory_ttl_hours,
+            disk_cache_dir=disk_cache_dir,
+            disk_ttl_days=cache_config.disk_ttl_days,
+            enable_disk_cache=cache_config.enable_disk_cache
+        )
+    
     def _generate_cache_key(self, query_data: Dict[str, Any]) -> str:
         """Generate a unique cache key for query data"""
         # Normalize addresses for consistent caching
         normalized_data = self._normalize_query_data(query_data)
         
-        # Create hash from normalized data
-        data_str = json.dumps(normalized_data, sort_keys=True)
-        return hashlib.md5(data_str.encode()).hexdigest()
+        # Build a compact canonical form instead of json.dumps: one field per key,
+        # list items joined with the unit separator, fields with the record separator
+        parts = []
+        for key in sorted(normalized_data):
+            value = normalized_data[key]
+            if isinstance(value, (list, tuple)):
+                value = "\x1f".join(map(str, value))
+            parts.append(f"{key}={value}")
+        return _hash_key("\x1e".join(parts))
     
     def _normalize_query_data(self, query_data: Dict[str, Any]) -> Dict[str, Any]:
         """Normalize query data for consistent caching"""
@@ -107,44 +230,36 @@ class PropertyCache:
     
     def _normalize_address(self, address: str) -> str:
         """Normalize address string for consistent caching"""
-        # Convert to lowercase and strip whitespace
-        addr = address.lower().strip()
-        
-        # Remove common variations
-        replacements = {
-            ' street': ' st',
-            ' avenue': ' ave',
-            ' road': ' rd',
-            ' drive': ' dr',
-            ' lane': ' ln',
-            ' court': ' ct',
-            ' place': ' pl',
-            ',  ': ', ',  # Multiple spaces after comma
-            '  ': ' '     # Multiple spaces
-        }
-        
-        for old, new in replacements.items():
-            addr = addr.replace(old, new)
-        
-        return addr
+        return _normalize_address(address)
     
     def get(self, query_data: Dict[str, Any]) -> Optional[Any]:
         """Get cached result for query"""
+        result = self.get_memory(query_data)
+        if result is not None:
+            return result
+        return self.get_disk(query_data)
+    
+    def get_memory(self, query_data: Dict[str, Any]) -> Optional[Any]:
+        """Look up the memory cache only; cheap enough to call on the event loop.
+        Misses are not counted, callers fall through to get_disk()."""
         cache_key = self._generate_cache_key(query_data)
         
-        # Try memory cache first
         result = self._get_from_memory(cache_key)
         if result is not None:
             self.stats.hits += 1
             logger.debug(f"Cache hit (memory): {cache_key[:8]}...")
-            return result
+        return result
+    
+    def get_disk(self, query_data: Dict[str, Any]) -> Optional[Any]:
+        """Look up the disk cache (blocking file I/O) and promote hits to memory"""
+        cache_key = self._generate_cache_key(query_data)
         
-        # Try disk cache
         if self.enable_disk_cache:
-            result = self._get_from_disk(cache_key)
-            if result is not None:
-                # Promote to memory cache
-                self._save_to_memory(cache_key, result)
+            entry = self._get_from_disk(cache_key)
+            if entry is not None:
+                result, remaining = entry
+                # Promote to memory cache, never outliving the disk entry (short-TTL negatives)
+                self._save_to_memory(cache_key, result, min(self.memory_ttl_seconds, remaining))
                 self.stats.hits += 1
                 logger.debug(f"Cache hit (disk): {cache_key[:8]}...")
                 return result
@@ -153,107 +268,132 @@ class PropertyCache:
         logger.debug(f"Cache miss: {cache_key[:8]}...")
         return None
     
-    def set(self, query_data: Dict[str, Any], result: Any) -> None:
-        """Cache result for query"""
-        cache_key = self._generate_cache_key(query_data)
+    def set(
+        self, query_data: Dict[str, Any], result: Any, ttl_override_seconds: Optional[float] = None
+    ) -> None:
+        """Cache result for query; ttl_override_seconds replaces both tiers' TTL for this entry"""
+        self.set_memory(query_data, result, ttl_override_seconds)
         
-        # Save to memory cache
-        self._save_to_memory(cache_key, result)
-        
-        # Save to disk cache
         if self.enable_disk_cache:
-            self._save_to_disk(cache_key, result, query_data)
+            self.set_disk(query_data, result, ttl_override_seconds)
+    
+    def set_many(
+        self, items: Iterable[Tuple[Dict[str, Any], Any]], ttl_override_seconds: Optional[float] = None
+    ) -> None:
+        """Cache several (query_data, result) pairs, writing the disk tier in one transaction"""
+        rows = []
+        for query_data, result in items:
+            cache_key = self._generate_cache_key(query_data)
+            self._save_to_memory(cache_key, result, ttl_override_seconds)
+            self.stats.saves += 1
+            if self.enable_disk_cache:
+                try:
+                    rows.append(self._disk_row(cache_key, result, query_data, ttl_override_seconds))
+                except Exception as e:
+                    logger.warning(f"Error serializing disk cache entry {cache_key}: {e}")
+        
+        if rows:
+            try:
+                with self._db_lock, self._db:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO cache(key, blob, expiry, addresses) VALUES (?, ?, ?, ?)", rows
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Error saving {len(rows)} entries to disk cache: {e}")
+    
+    def set_memory(
+        self, query_data: Dict[str, Any], result: Any, ttl_override_seconds: Optional[float] = None
+    ) -> None:
+        """Cache result in memory only"""
+        cache_key = self._generate_cache_key(query_data)
+        self._save_to_memory(cache_key, result, ttl_override_seconds)
         
         self.stats.saves += 1
         logger.debug(f"Cached result: {cache_key[:8]}...")
     
+    def set_disk(
+        self, query_data: Dict[str, Any], result: Any, ttl_override_seconds: Optional[float] = None
+    ) -> None:
+        """Persist result to the disk cache (blocking file I/O)"""
+        if self.enable_disk_cache:
+            cache_key = self._generate_cache_key(query_data)
+            self._save_to_disk(cache_key, result, query_data, ttl_override_seconds)
+    
     def _get_from_memory(self, cache_key: str) -> Optional[Any]:
         """Get result from memory cache"""
-        if cache_key not in self._memory_cache:
-            return None
-        
-        data, timestamp, access_count = self._memory_cache[cache_key]
-        
-        # Check if expired
-        if datetime.now() - timestamp > self.memory_ttl:
-            del self._memory_cache[cache_key]
-            return None
-        
-        # Update access count
-        self._memory_cache[cache_key] = (data, timestamp, access_count + 1)
-        return data
-    
-    def _save_to_memory(self, cache_key: str, data: Any) -> None:
-        """Save result to memory cache"""
-        # Evict if at capacity
-        if len(self._memory_cache) >= self.max_memory_items:
-            self._evict_memory_cache()
-        
-        self._memory_cache[cache_key] = (data, datetime.now(), 1)
+        with self._memory_lock:
+            entry = self._memory_cache.get(cache_key)
+            if entry is None:
+                return None
+            
+            data, expiry = entry
+            
+            # Check if expired
+            if time.monotonic() > expiry:
+                del self._memory_cache[cache_key]
+                return None
+            
+            # Mark as most recently used
+            self._memory_cache.move_to_end(cache_key)
+            return data
     
-    def _evict_memory_cache(self) -> None:
-        """Evict least recently used items from memory cache"""
-        if not self._memory_cache:
-            return
-        
-        # Sort by access count (ascending) then by timestamp (ascending)
-        sorted_items = sorted(
-            self._memory_cache.items(),
-            key=lambda x: (x[1][2], x[1][1])  # (access_count, timestamp)
-        )
-        
-        # Remove oldest 25% of items
-        items_to_remove = max(1, len(sorted_items) // 4)
-        for i in range(items_to_remove):
-            key = sorted_items[i][0]
-            del self._memory_cache[key]
-            self.stats.evictions += 1
-        
-        logger.debug(f"Evicted {items_to_remove} items from memory cache")
+    def _save_to_memory(self, cache_key: str, data: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Save result to memory cache, evicting least recently used entries"""
+        if ttl_seconds is None:
+            ttl_seconds = self.memory_ttl_seconds
+        with self._memory_lock:
+            self._memory_cache[cache_key] = (data, time.monotonic() + ttl_seconds)
+            self._memory_cache.move_to_end(cache_key)
+            
+            while len(self._memory_cache) > self.max_memory_items:
+                self._memory_cache.popitem(last=False)
+                self.stats.evictions += 1
     
-    def _get_from_disk(self, cache_key: str) -> Optional[Any]:
-        """Get result from disk cache"""
-        cache_file = self.disk_cache_dir / f"{cache_key}.pkl"
-        
-        if not cache_file.exists():
-            return None
-        
+    def _get_from_disk(self, cache_key: str) -> Optional[Tuple[Any, float]]:
+        """Get (result, seconds until expiry) from disk cache"""
         try:
-            # Check file age
-            file_time = datetime.fromtimestamp(cache_file.stat().st_mtime)
-            if datetime.now() - file_time > self.disk_ttl:
-                cache_file.unlink()  # Delete expired file
+            now = time.time()
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT blob, expiry FROM cache WHERE key = ? AND expiry > ?", (cache_key, now)
+                ).fetchone()
+            if row is None:
                 return None
-            
-            # Load cached data
-            with open(cache_file, 'rb') as f:
-                cached_data = pickle.load(f)
-            
-            return cached_data['result']
+            return _deserialize_result(_loads(row[0])), row[1] - now
             
         except Exception as e:
             logger.warning(f"Error reading disk cache {cache_key}: {e}")
-            # Delete corrupted file
+            # Delete corrupted entry
             try:
-                cache_file.unlink()
-            except:
+                with self._db_lock, self._db:
+                    self._db.execute("DELETE FROM cache WHERE key = ?", (cache_key,))
+            except sqlite3.Error:
                 pass
             return None
     
-    def _save_to_disk(self, cache_key: str, result: Any, query_data: Dict[str, Any]) -> None:
+    def _disk_row(
+        self, cache_key: str, result: Any, query_data: Dict[str, Any], ttl_seconds: Optional[float] = None
+    ) -> Tuple[str, bytes, float, str]:
+        """Build the (key, blob, expiry, addresses) row stored for a result"""
+        if ttl_seconds is None:
+            ttl_seconds = self.disk_ttl_seconds
+        blob = _dumps(_serialize_result(result))
+        # Normalized addresses, one per line, for substring invalidation
+        addresses = "\n".join(
+            self._normalize_address(addr) for addr in query_data.get('addresses', [])
+        )
+        return cache_key, blob, time.time() + ttl_seconds, addresses
+    
+    def _save_to_disk(
+        self, cache_key: str, result: Any, query_data: Dict[str, Any], ttl_seconds: Optional[float] = None
+    ) -> None:
         """Save result to disk cache"""
-        cache_file = self.disk_cache_dir / f"{cache_key}.pkl"
-        
         try:
-            cached_data = {
-                'result': result,
-                'query_data': query_data,
-                'timestamp': datetime.now(),
-                'version': '1.0'
-            }
-            
-            with open(cache_file, 'wb') as f:
-                pickle.dump(cached_data, f)
+            row = self._disk_row(cache_key, result, query_data, ttl_seconds)
+            with self._db_lock, self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache(key, blob, expiry, addresses) VALUES (?, ?, ?, ?)", row
+                )
                 
         except Exception as e:
             logger.warning(f"Error saving to disk cache {cache_key}: {e}")
@@ -263,31 +403,25 @@ class PropertyCache:
         normalized_addr = self._normalize_address(address)
         removed_count = 0
         
-        # Remove from memory cache
-        keys_to_remove = []
-        for key in self._memory_cache:
-            # We can't easily check the original query data from memory cache
-            # So we'll skip this for now - could be enhanced later
-            pass
-        
-        # Remove from disk cache
+        # Find matching disk entries by address, then drop them from both tiers
         if self.enable_disk_cache:
-            for cache_file in self.disk_cache_dir.glob("*.pkl"):
-                try:
-                    with open(cache_file, 'rb') as f:
-                        cached_data = pickle.load(f)
-                    
-                    query_data = cached_data.get('query_data', {})
-                    addresses = query_data.get('addresses', [])
-                    
-                    # Check if any address matches
-                    if any(normalized_addr in self._normalize_address(addr) 
-                           for addr in addresses):
-                        cache_file.unlink()
-                        removed_count += 1
-                        
-                except Exception as e:
-                    logger.warning(f"Error checking cache file {cache_file}: {e}")
+            escaped = (normalized_addr.replace("\\", "\\\\")
+                       .replace("%", "\\%")
+                       .replace("_", "\\_"))
+            try:
+                with self._db_lock, self._db:
+                    keys = [row[0] for row in self._db.execute(
+                        "SELECT key FROM cache WHERE addresses LIKE ? ESCAPE '\\'", (f"%{escaped}%",)
+                    )]
+                    self._db.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in keys])
+            except sqlite3.Error as e:
+                logger.warning(f"Error invalidating disk cache: {e}")
+                keys = []
+            
+            with self._memory_lock:
+                for key in keys:
+                    self._memory_cache.pop(key, None)
+            removed_count = len(keys)
         
         logger.info(f"Invalidated {removed_count} cache entries for address: {address}")
         return removed_count
@@ -298,46 +432,46 @@ class PropertyCache:
         disk_cleared = 0
         
         # Clear expired memory cache
-        current_time = datetime.now()
-        expired_keys = [
-            key for key, (_, timestamp, _) in self._memory_cache.items()
-            if current_time - timestamp > self.memory_ttl
-        ]
-        
-        for key in expired_keys:
-            del self._memory_cache[key]
-            memory_cleared += 1
+        now = time.monotonic()
+        with self._memory_lock:
+            expired_keys = [
+                key for key, (_, expiry) in self._memory_cache.items()
+                if now > expiry
+            ]
+            
+            for key in expired_keys:
+                del self._memory_cache[key]
+                memory_cleared += 1
         
         # Clear expired disk cache
         if self.enable_disk_cache:
-            for cache_file in self.disk_cache_dir.glob("*.pkl"):
-                try:
-                    file_time = datetime.fromtimestamp(cache_file.stat().st_mtime)
-                    if current_time - file_time > self.disk_ttl:
-                        cache_file.unlink()
-                        disk_cleared += 1
-                except Exception as e:
-                    logger.warning(f"Error clearing expired file {cache_file}: {e}")
+            try:
+                with self._db_lock, self._db:
+                    disk_cleared = self._db.execute(
+                        "DELETE FROM cache WHERE expiry <= ?", (time.time(),)
+                    ).rowcount
+            except sqlite3.Error as e:
+                logger.warning(f"Error clearing expired disk entries: {e}")
         
         logger.info(f"Cleared {memory_cleared} memory + {disk_cleared} disk expired entries")
         return memory_cleared, disk_cleared
     
     def clear_all(self) -> Tuple[int, int]:
         """Clear all cache entries"""
-        memory_count = len(self._memory_cache)
         disk_count = 0
         
         # Clear memory cache
-        self._memory_cache.clear()
+        with self._memory_lock:
+            memory_count = len(self._memory_cache)
+            self._memory_cache.clear()
         
         # Clear disk cache
         if self.enable_disk_cache:
-            for cache_file in self.disk_cache_dir.glob("*.pkl"):
-                try:
-                    cache_file.unlink()
-                    disk_count += 1
-                except Exception as e:
-                    logger.warning(f"Error deleting cache file {cache_file}: {e}")
+            try:
+                with self._db_lock, self._db:
+                    disk_count = self._db.execute("DELETE FROM cache").rowcount
+            except sqlite3.Error as e:
+                logger.warning(f"Error clearing disk cache: {e}")
         
         logger.info(f"Cleared all cache: {memory_count} memory + {disk_count} disk entries")
         return memory_count, disk_count
@@ -348,23 +482,24 @@ class PropertyCache:
         disk_size = 0
         disk_size_bytes = 0
         
-        if self.enable_disk_cache and self.disk_cache_dir.exists():
-            disk_files = list(self.disk_cache_dir.glob("*.pkl"))
-            disk_size = len(disk_files)
-            disk_size_bytes = sum(f.stat().st_size for f in disk_files)
+        if self.enable_disk_cache:
+            with self._db_lock:
+                disk_size, disk_size_bytes = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(blob)), 0) FROM cache"
+                ).fetchone()
         
         return {
             "memory_cache": {
                 "size": memory_size,
                 "max_size": self.max_memory_items,
-                "ttl_hours": self.memory_ttl.total_seconds() / 3600
+                "ttl_hours": self.memory_ttl_seconds / 3600
             },
             "disk_cache": {
                 "enabled": self.enable_disk_cache,
                 "size": disk_size,
                 "size_bytes": disk_size_bytes,
                 "size_mb": round(disk_size_bytes / (1024 * 1024), 2),
-                "ttl_days": self.disk_ttl.days
+                "ttl_days": self.disk_ttl_seconds // 86400
             },
             "statistics": self.stats.to_dict()
         }
\ No newline at end of file
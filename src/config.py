@@ -4,58 +4,201 @@ Handles environment variables, API clients, and DSPy setup.
 """
 
 import os
-import dspy
+import atexit
+import functools
+import logging
+import logging.handlers
+import queue
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, FrozenSet, Optional
 from dotenv import load_dotenv
-from tavily import TavilyClient
-from dspy.utils.callback import BaseCallback
+
+# dspy and tavily take seconds to import, so they are imported where first used
+if TYPE_CHECKING:
+    import dspy
+    from tavily import AsyncTavilyClient, TavilyClient
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _logging_callback_class():
+    """Define the DSPy logging callback on first use, so importing config doesn't import DSPy"""
+    from dspy.utils.callback import BaseCallback
+    
+    class AgentLoggingCallback(BaseCallback):
+        """Custom callback class for logging DSPy agent reasoning and actions"""
+        
+        _REASONING_PREFIX = "Thought"
+        
+        def on_module_end(self, call_id, outputs, exception):
+            # Runs on every ReAct step, so skip all formatting unless debug logging is on
+            if not logger.isEnabledFor(logging.DEBUG) or outputs is None:
+                return
+            step = "Reasoning" if self._is_reasoning_output(outputs) else "Acting"
+            # One record per step, built in a single join, rather than one write per field
+            lines = [f"== {step} Step ==="]
+            lines.extend(f"  {k}: {v}" for k, v in outputs.items())
+            logger.debug("\n".join(lines))
 
-class AgentLoggingCallback(BaseCallback):
-    """Custom callback class for logging DSPy agent reasoning and actions"""
+        def _is_reasoning_output(self, outputs):
+            prefix = self._REASONING_PREFIX
+            return any(k.startswith(prefix) for k in outputs)
     
-    def on_module_end(self, call_id, outputs, exception):
-        step = "Reasoning" if self._is_reasoning_output(outputs) else "Acting"
-        print(f"== {step} Step ===")
-        for k, v in outputs.items():
-            print(f"  {k}: {v}")
-        print("\n")
+    return AgentLoggingCallback
+
+
+_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+@functools.lru_cache(maxsize=1)
+def setup_logging(level: int = logging.INFO):
+    """Log through a queue drained by a background thread, so tool and handler threads never
+    block on stderr writes; like logging.basicConfig, a no-op if the root logger is already set up"""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    # Flush what is still queued on exit
+    atexit.register(listener.stop)
+    
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED = False
+
 
-    def _is_reasoning_output(self, outputs):
-        return any(k.startswith("Thought") for k in outputs.keys())
+def _configure_once():
+    """Configure DSPy with callbacks and language model, once per process"""
+    global _INITIALIZED
+    with _INIT_LOCK:
+        if _INITIALIZED:
+            return
+        import dspy
+        dspy.configure(
+            lm=get_lm(),
+            callbacks=[_logging_callback_class()()],
+            async_max_workers=int(os.getenv('ASYNC_MAX_WORKERS', '16'))
+        )
+        _INITIALIZED = True
+
+
+@functools.lru_cache(maxsize=1)
+def get_lm() -> "dspy.LM":
+    """Return the shared language model client"""
+    import dspy
+    return dspy.LM('openai/gpt-4o-mini', api_key=os.getenv('OPENAI_API_KEY'))
 
 
 def setup_dspy():
-    """Configure DSPy with callbacks and language model"""
-    dspy.configure(callbacks=[AgentLoggingCallback()])
-    lm = dspy.LM('openai/gpt-4o-mini', api_key=os.getenv('OPENAI_API_KEY'))
-    dspy.configure(lm=lm)
+    """Configure DSPy with callbacks and language model (no-op after the first call)"""
+    _configure_once()
+
+
+@functools.lru_cache(maxsize=1)
+def get_search_client() -> "TavilyClient":
+    """Return the shared Tavily search client, creating it on first use.
+
+    One client means one keep-alive connection pool, so repeated searches
+    skip the TCP/TLS handshake.
+    """
+    from requests.adapters import HTTPAdapter
+    from tavily import TavilyClient
+    from urllib3.util.retry import Retry
+    
+    client = TavilyClient(api_key=os.getenv('TAVILY_API_KEY'))
+    # Size the pool for concurrent tool calls (requests defaults to 10 per host), and retry
+    # dropped connections, throttling and transient 5xx with backoff on the same pool.
+    # Searches are read-only, so retrying Tavily's POST is safe.
+    session = getattr(client, 'session', None)
+    if session is not None:
+        retry = Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'POST'}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return client
+
+
+@functools.lru_cache(maxsize=1)
+def get_async_search_client() -> "AsyncTavilyClient":
+    """Return the shared async Tavily client for concurrent search fan-out.
+
+    Its httpx connection pool binds to the event loop that first uses it,
+    so it must only be used from search_cache's background loop.
+    """
+    import importlib.util
+    import httpx
+    from tavily import AsyncTavilyClient
+    
+    transport = httpx.AsyncHTTPTransport(
+        # HTTP/2 multiplexes concurrent searches over one connection when h2 is installed
+        http2=importlib.util.find_spec('h2') is not None,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+        retries=2  # Re-establish connections that fail to connect (e.g. a stale keep-alive)
+    )
+    http_client = httpx.AsyncClient(transport=transport)
+    return AsyncTavilyClient(api_key=os.getenv('TAVILY_API_KEY'), client=http_client)
+
+
+@dataclass(frozen=True)
+class TelegramConfig:
+    """Telegram bot settings, parsed once from the environment"""
+    token: Optional[str]
+    webhook_url: Optional[str]
+    webhook_port: int
+    allowed_users: FrozenSet[str]  # Checked on every message, so a set rather than a sequence
 
 
-def get_search_client():
-    """Initialize and return Tavily search client"""
-    return TavilyClient(api_key=os.getenv('TAVILY_API_KEY'))
+@dataclass(frozen=True)
+class CacheConfig:
+    """Valuation cache settings, parsed once from the environment"""
+    enable_cache: bool
+    memory_max_items: int
+    memory_ttl_hours: int
+    disk_cache_dir: str
+    disk_ttl_days: int
+    enable_disk_cache: bool
 
 
-def get_telegram_config():
+# Built on first call rather than at import, since the entry point may still adjust
+# the environment (e.g. the derived webhook URL); call .cache_clear() to re-read it
+@functools.lru_cache(maxsize=1)
+def get_telegram_config() -> TelegramConfig:
     """Get Telegram bot configuration"""
-    return {
-        'token': os.getenv('TELEGRAM_BOT_TOKEN'),
-        'webhook_url': os.getenv('TELEGRAM_WEBHOOK_URL'),
-        'webhook_port': int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8443')),
-        'allowed_users': os.getenv('TELEGRAM_ALLOWED_USERS', '').split(',') if os.getenv('TELEGRAM_ALLOWED_USERS') else []
-    }
+    allowed_users = os.getenv('TELEGRAM_ALLOWED_USERS')
+    return TelegramConfig(
+        token=os.getenv('TELEGRAM_BOT_TOKEN'),
+        webhook_url=os.getenv('TELEGRAM_WEBHOOK_URL'),
+        webhook_port=int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8443')),
+        allowed_users=frozenset(allowed_users.split(',')) if allowed_users else frozenset()
+    )
 
 
-def get_cache_config():
+@functools.lru_cache(maxsize=1)
+def get_cache_config() -> CacheConfig:
     """Get cache configuration"""
-    return {
-        'enable_cache': os.getenv('ENABLE_CACHE', 'true').lower() == 'true',
-        'memory_max_items': int(os.getenv('CACHE_MEMORY_MAX_ITEMS', '100')),
-        'memory_ttl_hours': int(os.getenv('CACHE_MEMORY_TTL_HOURS', '24')),
-        'disk_cache_dir': os.getenv('CACHE_DISK_DIR', 'cache'),
-        'disk_ttl_days': int(os.getenv('CACHE_DISK_TTL_DAYS', '7')),
-        'enable_disk_cache': os.getenv('CACHE_ENABLE_DISK', 'true').lower() == 'true'
-    }
\ No newline at end of file
+    return CacheConfig(
+        enable_cache=os.getenv('ENABLE_CACHE', 'true').lower() == 'true',
+        memory_max_items=int(os.getenv('CACHE_MEMORY_MAX_ITEMS', '100')),
+        memory_ttl_hours=int(os.getenv('CACHE_MEMORY_TTL_HOURS', '24')),
+        disk_cache_dir=os.getenv('CACHE_DISK_DIR', 'cache'),
+        disk_ttl_days=int(os.getenv('CACHE_DISK_TTL_DAYS', '7')),
+        enable_disk_cache=os.getenv('CACHE_ENABLE_DISK', 'true').lower() == 'true'
+    )
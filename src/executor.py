@@ -0,0 +1,26 @@
+"""
+Shared thread pool for running blocking DSPy work from async code.
+One process-wide executor replaces the per-agent pools so concurrent users
+are not serialized behind a fixed two-worker limit.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+# Sized like DSPy CLI's --sync-workers default; override with DSPY_SYNC_WORKERS
+_MAX_WORKERS = int(os.getenv('DSPY_SYNC_WORKERS', min(32, (os.cpu_count() or 4) + 4)))
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=_MAX_WORKERS, thread_name_prefix="dspy-sync")
+atexit.register(_EXECUTOR.shutdown, wait=False)
+
+
+def run_sync(fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+    """Run a blocking callable on the shared executor, preserving contextvars
+    so settings like dspy.context(lm=...) propagate into the worker thread"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return loop.run_in_executor(_EXECUTOR, ctx.run, fn, *args)
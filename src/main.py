@@ -2,8 +2,44 @@
 Main entry point for DSPy real estate property valuation agent.
 """
 
-from config import setup_dspy
+import functools
+import logging
+from typing import Any, Optional
+
+from config import setup_dspy, get_cache_config
 from agent import create_real_estate_agent, display_results
+from cache_manager import PropertyCache
+from tools import track_skipped_searches, with_search_scope
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _prediction_cache() -> Optional[PropertyCache]:
+    """Cache of whole agent predictions keyed by question (None when caching is disabled)"""
+    cache_config = get_cache_config()
+    if not cache_config.enable_cache:
+        return None
+    return PropertyCache.from_config(cache_config, subdir='predictions')
+
+
+def cached_predict(agent, question: str) -> Any:
+    """Run the agent, returning a cached prediction for a question that was already answered"""
+    cache = _prediction_cache()
+    if cache is None:
+        return agent(question=question)
+    
+    cache_data = {'question': question}
+    prediction = cache.get(cache_data)
+    if prediction is None:
+        with track_skipped_searches() as skipped:
+            prediction = agent(question=question)
+        # Searches skipped by the circuit breaker leave the answer short of data; don't keep it
+        if skipped.is_set():
+            logger.warning("Not caching prediction made while searches were skipped")
+        else:
+            cache.set(cache_data, prediction)
+    return prediction
 
 
 def main():
@@ -11,13 +47,13 @@ def main():
     # Setup DSPy configuration
     setup_dspy()
     
-    # Create the agent
-    agent = create_real_estate_agent()
+    # Create the agent; each run shares one search cache across its tool calls
+    agent = with_search_scope(create_real_estate_agent())
     
     # Example queries (uncomment to test different scenarios)
     # prediction = agent(question="What is the estimated price of 340 Barneson Avenue San Mateo CA 94402 today?")
     # prediction = agent(question="What is the estimated price of 289A Gaffney Street, Pascoe Vale, VIC 3044 Australia?")
-    prediction = agent(question="If I want to sell two houses 289A Gaffney Street, Pascoe Vale, VIC 3044 Australia and 289 Gaffney Street, Pascoe Vale, VIC 3044 Australia, what is the estimated price of the two houses when selling them together?")
+    prediction = cached_predict(agent, question="If I want to sell two houses 289A Gaffney Street, Pascoe Vale, VIC 3044 Australia and 289 Gaffney Street, Pascoe Vale, VIC 3044 Australia, what is the estimated price of the two houses when selling them together?")
     
     # Display formatted results
     display_results(prediction)
@@ -8,6 +8,14 @@ from signatures import MarketIntelligenceSignature
 from tools import (
     get_current_time, get_price_history_analysis, 
     get_market_velocity_analysis, get_market_competition_analysis,
+    get_neighborhood_stats, prewarm_signals, with_search_scope
+)
+
+# Search-backed tools the market agent nearly always calls with the target address
+_PREWARM_TOOLS = (
+    get_price_history_analysis,
+    get_market_velocity_analysis,
+    get_market_competition_analysis,
     get_neighborhood_stats
 )
 
@@ -31,6 +39,19 @@ def create_market_intelligence_agent():
     return agent
 
 
+def prewarm_market_searches(address: str):
+    """Run the market tools concurrently so their searches land in the current search scope"""
+    prewarm_signals([address], _PREWARM_TOOLS)
+
+
+def run_market_intelligence(agent, question: str, address: str):
+    """Run the market agent with its searches prefetched, so its tool calls hit the scope cache"""
+    def run():
+        prewarm_market_searches(address)
+        return agent(question=question)
+    return with_search_scope(run)()
+
+
 def display_market_intelligence_results(prediction) -> str:
     """Format and display market intelligence analysis results"""
     
@@ -90,7 +111,7 @@ def run_market_analysis_example():
     print(f"🔍 Running market intelligence analysis for: {test_address}")
     
     # Get prediction
-    prediction = agent(question=question)
+    prediction = run_market_intelligence(agent, question, test_address)
     
     # Display results
     display_market_intelligence_results(prediction)
@@ -4,11 +4,34 @@ Extracts addresses and property queries from user messages using LLM.
 """
 
 import re
-import json
-import dspy
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple
 from pydantic import BaseModel
 
+# orjson is installed alongside DSPy; it parses the LLM's address list faster than json
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+
+# Regexes for the fallback parser and validation, compiled once at import.
+# Each is a single alternation so a message is scanned once per check.
+_ADDRESS_RE = re.compile(r'(\d+[A-Z]?\s+[^,\n]+(?:,\s*[^,\n]+)*)', re.IGNORECASE)
+_COMPARISON_RE = re.compile(r'compare|vs|versus', re.IGNORECASE)
+_MULTIPLE_RE = re.compile(r'both|multiple|together', re.IGNORECASE)
+# Validation runs on every message; ASCII mode keeps \d and \b to simple byte-class tests
+_HAS_DIGIT_RE = re.compile(r'\d', re.ASCII)
+_STREET_RE = re.compile(
+    r'\b(?:street|st|avenue|ave|road|rd|drive|dr|lane|ln|court|ct|place|pl|crescent|cres)\b',
+    re.IGNORECASE | re.ASCII
+)
+
+# Concurrent LLM calls when parsing a batch of messages
+_MAX_PARSE_THREADS = 8
+
 
 class PropertyQuery(BaseModel):
     """Structured property query from user message"""
@@ -17,74 +40,88 @@ class PropertyQuery(BaseModel):
     raw_message: str
 
 
-class AddressParsingSignature(dspy.Signature):
-    """Parse user message to extract property addresses and determine query type."""
+@functools.lru_cache(maxsize=1)
+def _address_parsing_signature():
+    """Define the parsing signature on first use, so PropertyQuery and the regex
+    fallback can be imported without loading DSPy"""
+    import dspy
+    
+    class AddressParsingSignature(dspy.Signature):
+        """Parse user message to extract property addresses and determine query type."""
+        
+        user_message = dspy.InputField(desc="User's message about property valuation")
+        addresses = dspy.OutputField(desc="List of complete property addresses found in the message, as JSON array of strings. Include full address with street, suburb/city, state/region, and postcode/zipcode when available.")
+        query_type = dspy.OutputField(desc="Type of query: 'single' for one property, 'multiple' for multiple properties being combined/sold together, 'compare' for comparing different properties")
+        confidence = dspy.OutputField(desc="Confidence score (0.0-1.0) in the parsing accuracy")
     
-    user_message = dspy.InputField(desc="User's message about property valuation")
-    addresses = dspy.OutputField(desc="List of complete property addresses found in the message, as JSON array of strings. Include full address with street, suburb/city, state/region, and postcode/zipcode when available.")
-    query_type = dspy.OutputField(desc="Type of query: 'single' for one property, 'multiple' for multiple properties being combined/sold together, 'compare' for comparing different properties")
-    confidence = dspy.OutputField(desc="Confidence score (0.0-1.0) in the parsing accuracy")
+    return AddressParsingSignature
 
 
 class MessageParser:
     """LLM-powered parser for extracting property information from user messages"""
     
     def __init__(self):
-        self.address_parser = dspy.Predict(AddressParsingSignature)
+        import dspy
+        self.address_parser = dspy.Predict(_address_parsing_signature())
     
     def parse_message(self, message: str) -> PropertyQuery:
         """Parse user message and extract property query information using LLM"""
         try:
             # Use LLM to parse the message
             result = self.address_parser(user_message=message)
-            
-            # Parse the addresses JSON
-            try:
-                addresses = json.loads(result.addresses)
-                if not isinstance(addresses, list):
-                    addresses = [str(addresses)] if addresses else []
-            except (json.JSONDecodeError, TypeError):
-                # Fallback: treat as single address if JSON parsing fails
-                addresses = [result.addresses.strip()] if result.addresses.strip() else []
-            
-            # Validate and clean addresses
-            addresses = [addr.strip() for addr in addresses if addr and addr.strip()]
-            
-            # Ensure query type is valid
-            query_type = result.query_type.lower()
-            if query_type not in ['single', 'multiple', 'compare']:
-                query_type = 'single' if len(addresses) <= 1 else 'multiple'
-            
-            return PropertyQuery(
-                addresses=addresses,
-                query_type=query_type,
-                raw_message=message
-            )
-            
+            return self._to_query(message, result)
         except Exception as e:
             # Fallback to simple regex-based parsing if LLM fails
             return self._fallback_parse(message)
     
+    def parse_messages(self, messages: List[str]) -> List[PropertyQuery]:
+        """Parse several messages with their LLM calls in flight concurrently, in message order"""
+        if not messages:
+            return []
+        # Each message keeps its own regex fallback; copied contexts carry any dspy.context overrides
+        with ThreadPoolExecutor(max_workers=min(len(messages), _MAX_PARSE_THREADS)) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, self.parse_message, m) for m in messages]
+            return [future.result() for future in futures]
+    
+    def _to_query(self, message: str, result) -> PropertyQuery:
+        """Build a PropertyQuery from the parser's prediction (raises if it is unusable)"""
+        # Parse the addresses JSON
+        try:
+            addresses = _json.loads(result.addresses)
+            if not isinstance(addresses, list):
+                addresses = [str(addresses)] if addresses else []
+        except (_json.JSONDecodeError, TypeError, ValueError):
+            # Fallback: treat as single address if JSON parsing fails
+            addresses = [result.addresses.strip()] if result.addresses.strip() else []
+        
+        # Validate and clean addresses
+        addresses = [addr.strip() for addr in addresses if addr and addr.strip()]
+        
+        # Ensure query type is valid
+        query_type = result.query_type.lower()
+        if query_type not in ['single', 'multiple', 'compare']:
+            query_type = 'single' if len(addresses) <= 1 else 'multiple'
+        
+        return PropertyQuery(
+            addresses=addresses,
+            query_type=query_type,
+            raw_message=message
+        )
+    
     def _fallback_parse(self, message: str) -> PropertyQuery:
         """Fallback parsing using simple heuristics when LLM fails"""
-        # Simple regex patterns for fallback
-        basic_patterns = [
-            r'(\d+[A-Z]?\s+[^,\n]+(?:,\s*[^,\n]+)*)',  # Basic address pattern
-        ]
-        
         addresses = []
-        for pattern in basic_patterns:
-            matches = re.findall(pattern, message, re.IGNORECASE)
-            for match in matches:
-                addr = match.strip()
-                if addr and len(addr) > 5 and addr not in addresses:
-                    addresses.append(addr)
+        seen = set()
+        for match in _ADDRESS_RE.findall(message):
+            addr = match.strip()
+            if len(addr) > 5 and addr not in seen:
+                seen.add(addr)
+                addresses.append(addr)
         
         # Simple query type determination
-        message_lower = message.lower()
-        if any(word in message_lower for word in ['compare', 'vs', 'versus']):
+        if _COMPARISON_RE.search(message):
             query_type = 'compare'
-        elif len(addresses) > 1 or any(word in message_lower for word in ['both', 'multiple', 'together']):
+        elif len(addresses) > 1 or _MULTIPLE_RE.search(message):
             query_type = 'multiple'
         else:
             query_type = 'single'
@@ -111,24 +148,17 @@ class MessageParser:
     
     def _is_valid_address(self, address: str) -> bool:
         """Basic address validation"""
-        # Must have at least a number and reasonable content
-        if not re.search(r'\d+', address):
-            return False
-        
         # Must be reasonable length
         if len(address.strip()) < 5:
             return False
         
-        # Should contain typical address components
-        address_lower = address.lower()
-        has_street_indicator = any(indicator in address_lower for indicator in 
-                                 ['street', 'st', 'avenue', 'ave', 'road', 'rd', 'drive', 'dr', 
-                                  'lane', 'ln', 'court', 'ct', 'place', 'pl', 'crescent', 'cres'])
-        
-        # Either has street indicator or has geographic pattern (number + name + location)
-        has_geographic_pattern = len(address.split(',')) >= 2 or len(address.split()) >= 3
+        # Must have at least a number and reasonable content
+        if not _HAS_DIGIT_RE.search(address):
+            return False
         
-        return has_street_indicator or has_geographic_pattern
+        # Should contain a geographic pattern (number + name + location) or a street indicator;
+        # the plain string checks usually decide it before the regex has to run
+        return ',' in address or len(address.split()) >= 3 or bool(_STREET_RE.search(address))
     
     def format_query_summary(self, query: PropertyQuery) -> str:
         """Create a summary of the parsed query for user confirmation"""
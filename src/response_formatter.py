@@ -3,100 +3,76 @@ Response formatting utilities for Telegram bot.
 Formats property valuation results for user-friendly display.
 """
 
-from typing import Any, Dict
+import bisect
+import re
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
-from pydantic import BaseModel
+from dataclasses import dataclass
 
 
-class FormattedResponse(BaseModel):
+# Built on every reply, so a slotted dataclass rather than a validated pydantic model;
+# frozen so constant responses can be built once and shared
+@dataclass(slots=True, frozen=True)
+class FormattedResponse:
     """Formatted response for Telegram"""
     text: str
     parse_mode: str = "Markdown"
 
 
-class ResponseFormatter:
-    """Formatter for property valuation responses"""
-    
-    def __init__(self):
-        self.max_message_length = 4096  # Telegram limit
-    
-    def format_property_valuation(self, prediction: Any) -> FormattedResponse:
-        """Format a complete property valuation response"""
-        try:
-            # Extract key information
-            confidence_emoji = self._get_confidence_emoji(prediction.confidence)
-            
-            response = f"""🏠 *Property Valuation Report* {confidence_emoji}
+# Keyword filters for the section helpers, one case-insensitive scan per line
+_MARKET_KW_RE = re.compile(r"school|crime|median", re.IGNORECASE)
+_ESTIMATE_KW_RE = re.compile(r"estimate|final", re.IGNORECASE)
+_ASSEMBLY_KW_RE = re.compile(r"assembly|premium", re.IGNORECASE)
 
-📍 *Property Details*
-{self._format_property_details(prediction.property_details)}
 
-💰 *Final Estimate*
-{self._format_final_estimate(prediction.final_estimate)}
+def _bullets(lines: Iterable[str], keep: Callable[[str], Any], limit: int) -> Iterator[str]:
+    """Yield up to limit bulleted lines, stripped, skipping blanks and lines keep() rejects"""
+    stripped = (line.strip() for line in lines)
+    return islice((f"• {line}" for line in stripped if line and keep(line)), limit)
 
-📊 *Price Range*
-{self._format_price_range(prediction.price_range)}
 
-🏘️ *Comparable Sales*
-{self._format_comparable_sales(prediction.comparable_sales)}
+# Confidence tiers as (report emoji, level emoji, level name); bisect_right over the
+# lower bounds picks the tier in one call
+_TIER_THRESHOLDS = (0.6, 0.8)
+_CONFIDENCE_TIERS = (
+    ("❓", "🔴", "Low"),
+    ("📊", "🟡", "Medium"),
+    ("🎯", "🟢", "High"),
+)
 
-📈 *Market Analysis*
-{self._format_market_analysis(prediction.neighborhood_analysis, prediction.market_adjustments)}
 
-🔍 *Confidence Level*
-{self._format_confidence(prediction.confidence)}
+def _confidence_tier(confidence: float) -> Tuple[str, str, str]:
+    """Look up the tier record for a 0-1 confidence score"""
+    return _CONFIDENCE_TIERS[bisect.bisect_right(_TIER_THRESHOLDS, confidence)]
 
-⚡ *Analysis Complete*"""
 
-            # Truncate if too long
-            if len(response) > self.max_message_length:
-                response = self._create_summary_response(prediction)
-            
-            return FormattedResponse(text=response)
-            
-        except Exception as e:
-            return self._format_error_response(str(e))
-    
-    def format_multiple_properties(self, prediction: Any) -> FormattedResponse:
-        """Format response for multiple adjacent properties"""
-        try:
-            confidence_emoji = self._get_confidence_emoji(prediction.confidence)
-            
-            response = f"""🏘️ *Combined Property Valuation* {confidence_emoji}
+def _confidence_label(percentage: int) -> str:
+    """Format a whole-number confidence percentage with its tier"""
+    _, emoji, level = _confidence_tier(percentage / 100)
+    return f"{emoji} {percentage}% ({level})"
 
-📍 *Properties Analyzed*
-{self._format_property_details(prediction.property_details)}
 
-💰 *Combined Estimate*
-{self._format_final_estimate(prediction.final_estimate)}
+# Every in-range label, so formatting a confidence is a single index
+_CONFIDENCE_LABELS = tuple(_confidence_label(percentage) for percentage in range(101))
 
-📊 *Price Range*
-{self._format_price_range(prediction.price_range)}
+# Headers and section titles for the full valuation reports (see _render_sections)
+_HDR_VALUATION = "🏠 *Property Valuation Report*"
+_HDR_COMBINED = "🏘️ *Combined Property Valuation*"
+_SEC_DETAILS = "📍 *Property Details*"
+_SEC_PROPERTIES = "📍 *Properties Analyzed*"
+_SEC_ESTIMATE = "💰 *Final Estimate*"
+_SEC_COMBINED_ESTIMATE = "💰 *Combined Estimate*"
+_SEC_PRICE_RANGE = "📊 *Price Range*"
+_SEC_COMPARABLES = "🏘️ *Comparable Sales*"
+_SEC_LAND_ASSEMBLY = "🔗 *Land Assembly Premium*"
+_SEC_MARKET_ANALYSIS = "📈 *Market Analysis*"
+_SEC_MARKET_CONTEXT = "🏘️ *Market Context*"
+_SEC_CONFIDENCE = "🔍 *Confidence Level*"
+_REPORT_FOOTER = "⚡ *Analysis Complete*"
 
-🔗 *Land Assembly Premium*
-{self._format_land_assembly_info(prediction.market_adjustments)}
-
-🏘️ *Market Context*
-{self._format_market_analysis(prediction.neighborhood_analysis, prediction.market_adjustments)}
-
-🔍 *Confidence Level*
-{self._format_confidence(prediction.confidence)}
-
-⚡ *Analysis Complete*"""
-
-            if len(response) > self.max_message_length:
-                response = self._create_summary_response(prediction)
-                
-            return FormattedResponse(text=response)
-            
-        except Exception as e:
-            return self._format_error_response(str(e))
-    
-    def format_quick_estimate(self, address: str, estimate: str, confidence: float) -> FormattedResponse:
-        """Format a quick estimate response"""
-        confidence_emoji = self._get_confidence_emoji(confidence)
-        
-        response = f"""🏠 *Quick Estimate* {confidence_emoji}
+# Message layouts, parsed once at import and filled in with str.format per reply
+_QUICK_ESTIMATE_TEMPLATE = """🏠 *Quick Estimate* {confidence_emoji}
 
 📍 *Address*
 {address}
@@ -105,27 +81,11 @@ class ResponseFormatter:
 {estimate}
 
 🔍 *Confidence*
-{int(confidence * 100)}%
+{percentage}%
 
 💡 Use /detailed for full analysis"""
 
-        return FormattedResponse(text=response)
-    
-    def format_processing_message(self, addresses: list) -> FormattedResponse:
-        """Format a processing message"""
-        if len(addresses) == 1:
-            text = f"🔍 Analyzing property at:\n📍 {addresses[0]}\n\n⏳ This may take 30-60 seconds..."
-        else:
-            text = f"🔍 Analyzing {len(addresses)} properties:\n"
-            for i, addr in enumerate(addresses, 1):
-                text += f"📍 {i}. {addr}\n"
-            text += "\n⏳ This may take 60-90 seconds..."
-        
-        return FormattedResponse(text=text)
-    
-    def format_help_message(self) -> FormattedResponse:
-        """Format help message"""
-        response = """🏠 *Real Estate Valuation Bot*
+_HELP_TEXT = """🏠 *Real Estate Valuation Bot*
 
 *Available Commands:*
 /start - Welcome message
@@ -151,59 +111,202 @@ Just send me an address like:
 
 💡 *Tip:* Include full addresses with suburb/city and postal code for best results."""
 
-        return FormattedResponse(text=response)
+_MARKET_INTELLIGENCE_TEMPLATE = """📊 **Market Intelligence Report**
+📍 **Property:** `{address}`
+
+📈 **Price History & Trends**
+{price_history}
+
+📊 **Current Market Conditions**
+{market_trends}
+
+⚡ **Market Velocity**
+{market_velocity}
+
+🌟 **Seasonal Analysis**
+{seasonal_analysis}
+
+⚖️ **Supply & Demand**
+{supply_demand}
+
+🔮 **Market Predictions**
+{market_predictions}
+
+💡 **Investment Insights**
+{investment_insights}
+
+{confidence_emoji} **Confidence:** {confidence:.1%}
+
+📅 *Generated: {generated}*"""
+
+_SUMMARY_TEMPLATE = """🏠 *Property Valuation Summary* {confidence_emoji}
+
+💰 *{final_estimate}*
+
+📊 *Range:* {price_range}
+
+🔍 *Confidence:* {confidence}
+
+💡 Full report available - contact for details"""
+
+_SUMMARY_FALLBACK = "📊 Valuation complete - contact for detailed results"
+
+_ERROR_TEMPLATE = """❌ *Analysis Error*
+
+Sorry, I encountered an issue processing your request.
+
+*Error:* {error}...
+
+Please try:
+• Checking the address format
+• Using a more specific address
+• Trying again in a few moments
+
+Type /help for usage examples."""
+
+
+class ResponseFormatter:
+    """Formatter for property valuation responses"""
     
-    def format_market_intelligence(self, prediction, address: str) -> FormattedResponse:
-        """Format market intelligence analysis results"""
-        text = f"📊 **Market Intelligence Report**\n"
-        text += f"📍 **Property:** `{address}`\n\n"
-        
-        # Price History
-        text += f"📈 **Price History & Trends**\n"
-        text += f"{self._truncate_text(prediction.price_history, 300)}\n\n"
-        
-        # Market Trends
-        text += f"📊 **Current Market Conditions**\n"
-        text += f"{self._truncate_text(prediction.market_trends, 300)}\n\n"
-        
-        # Market Velocity
-        text += f"⚡ **Market Velocity**\n"
-        text += f"{self._truncate_text(prediction.market_velocity, 250)}\n\n"
-        
-        # Seasonal Analysis
-        text += f"🌟 **Seasonal Analysis**\n"
-        text += f"{self._truncate_text(prediction.seasonal_analysis, 250)}\n\n"
+    # Static replies are built once and shared by every call
+    _HELP_RESPONSE = FormattedResponse(text=_HELP_TEXT)
+    
+    def __init__(self):
+        self.max_message_length = 4096  # Telegram limit
+    
+    def format_property_valuation(self, prediction: Any) -> FormattedResponse:
+        """Format a complete property valuation response"""
+        try:
+            return FormattedResponse(text=self._format_valuation_text(prediction))
+        except (AttributeError, TypeError, ValueError) as e:
+            return self._format_error_response(str(e))
+    
+    def format_multiple_properties(self, prediction: Any) -> FormattedResponse:
+        """Format response for multiple adjacent properties"""
+        try:
+            return FormattedResponse(text=self._format_multiple_text(prediction))
+        except (AttributeError, TypeError, ValueError) as e:
+            return self._format_error_response(str(e))
+    
+    def _format_valuation_text(self, prediction: Any) -> str:
+        """Build the valuation report text, or the summary if it is too long"""
+        # Read every field up front so a malformed prediction fails before any formatting
+        confidence, details, estimate, price_range, comps, neighborhood = (
+            prediction.confidence, prediction.property_details, prediction.final_estimate,
+            prediction.price_range, prediction.comparable_sales, prediction.neighborhood_analysis
+        )
         
-        # Supply & Demand
-        text += f"⚖️ **Supply & Demand**\n"
-        text += f"{self._truncate_text(prediction.supply_demand, 250)}\n\n"
+        # Split each field once; the section helpers all work on line lists
+        response = self._render_sections(
+            f"{_HDR_VALUATION} {self._get_confidence_emoji(confidence)}",
+            [
+                (_SEC_DETAILS, self._format_property_details, (details.split('\n'),)),
+                (_SEC_ESTIMATE, self._format_final_estimate, (estimate.split('\n'),)),
+                (_SEC_PRICE_RANGE, self._format_price_range, (price_range,)),
+                (_SEC_COMPARABLES, self._format_comparable_sales, (comps.split('\n'),)),
+                (_SEC_MARKET_ANALYSIS, self._format_market_analysis, (neighborhood.split('\n'),)),
+                (_SEC_CONFIDENCE, self._format_confidence, (confidence,)),
+            ]
+        )
         
-        # Market Predictions
-        text += f"🔮 **Market Predictions**\n"
-        text += f"{self._truncate_text(prediction.market_predictions, 300)}\n\n"
+        # Too long for one message: fall back to the summary
+        if response is None:
+            response = self._create_summary_response(prediction)
+        return response
+    
+    def _format_multiple_text(self, prediction: Any) -> str:
+        """Build the combined valuation report text, or the summary if it is too long"""
+        # Read every field up front so a malformed prediction fails before any formatting
+        confidence, details, estimate, price_range, adjustments, neighborhood = (
+            prediction.confidence, prediction.property_details, prediction.final_estimate,
+            prediction.price_range, prediction.market_adjustments, prediction.neighborhood_analysis
+        )
         
-        # Investment Insights
-        text += f"💡 **Investment Insights**\n"
-        text += f"{self._truncate_text(prediction.investment_insights, 300)}\n\n"
+        # Split each field once; the section helpers all work on line lists
+        response = self._render_sections(
+            f"{_HDR_COMBINED} {self._get_confidence_emoji(confidence)}",
+            [
+                (_SEC_PROPERTIES, self._format_property_details, (details.split('\n'),)),
+                (_SEC_COMBINED_ESTIMATE, self._format_final_estimate, (estimate.split('\n'),)),
+                (_SEC_PRICE_RANGE, self._format_price_range, (price_range,)),
+                (_SEC_LAND_ASSEMBLY, self._format_land_assembly_info, (adjustments.split('\n'),)),
+                (_SEC_MARKET_CONTEXT, self._format_market_analysis, (neighborhood.split('\n'),)),
+                (_SEC_CONFIDENCE, self._format_confidence, (confidence,)),
+            ]
+        )
         
-        # Confidence
-        confidence_emoji = "🟢" if prediction.confidence > 0.7 else "🟡" if prediction.confidence > 0.4 else "🔴"
-        text += f"{confidence_emoji} **Confidence:** {prediction.confidence:.1%}\n\n"
+        if response is None:
+            response = self._create_summary_response(prediction)
+        return response
+    
+    def format_quick_estimate(self, address: str, estimate: str, confidence: float) -> FormattedResponse:
+        """Format a quick estimate response"""
+        response = _QUICK_ESTIMATE_TEMPLATE.format(
+            confidence_emoji=self._get_confidence_emoji(confidence),
+            address=address,
+            estimate=estimate,
+            percentage=int(confidence * 100)
+        )
+
+        return FormattedResponse(text=response)
+    
+    def format_processing_message(self, addresses: list) -> FormattedResponse:
+        """Format a processing message"""
+        if len(addresses) == 1:
+            text = f"🔍 Analyzing property at:\n📍 {addresses[0]}\n\n⏳ This may take 30-60 seconds..."
+        else:
+            header = f"🔍 Analyzing {len(addresses)} properties:"
+            lines = [f"📍 {i}. {addr}" for i, addr in enumerate(addresses, 1)]
+            text = "\n".join([header, *lines, "", "⏳ This may take 60-90 seconds..."])
         
-        text += f"📅 *Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}*"
+        return FormattedResponse(text=text)
+    
+    def format_help_message(self) -> FormattedResponse:
+        """Format help message"""
+        return self._HELP_RESPONSE
+    
+    def format_market_intelligence(self, prediction, address: str) -> FormattedResponse:
+        """Format market intelligence analysis results"""
+        confidence = prediction.confidence
+        text = _MARKET_INTELLIGENCE_TEMPLATE.format_map({
+            'address': address,
+            'price_history': self._truncate_text(prediction.price_history, 300),
+            'market_trends': self._truncate_text(prediction.market_trends, 300),
+            'market_velocity': self._truncate_text(prediction.market_velocity, 250),
+            'seasonal_analysis': self._truncate_text(prediction.seasonal_analysis, 250),
+            'supply_demand': self._truncate_text(prediction.supply_demand, 250),
+            'market_predictions': self._truncate_text(prediction.market_predictions, 300),
+            'investment_insights': self._truncate_text(prediction.investment_insights, 300),
+            'confidence_emoji': "🟢" if confidence > 0.7 else "🟡" if confidence > 0.4 else "🔴",
+            'confidence': confidence,
+            'generated': datetime.now().strftime('%Y-%m-%d %H:%M')
+        })
         
         return FormattedResponse(text=text, parse_mode="Markdown")
     
+    def _render_sections(self, header: str, sections: list) -> Optional[str]:
+        """Render a report from its header and (title, formatter, args) sections in one join.
+        Returns None as soon as the report would exceed the message limit, skipping the rest."""
+        parts = [header]
+        length = len(header) + len(_REPORT_FOOTER) + 2
+        for title, formatter, args in sections:
+            part = f"{title}\n{formatter(*args)}"
+            length += len(part) + 2  # Plus the blank-line separator
+            if length > self.max_message_length:
+                return None
+            parts.append(part)
+        parts.append(_REPORT_FOOTER)
+        return "\n\n".join(parts)
+    
     def _truncate_text(self, text: str, max_length: int) -> str:
         """Truncate text to maximum length while preserving meaning"""
         if len(text) <= max_length:
             return text
         
-        # Find last complete sentence within limit
-        truncated = text[:max_length]
-        last_period = truncated.rfind('.')
-        last_exclaim = truncated.rfind('!')
-        last_question = truncated.rfind('?')
+        # Find last complete sentence within limit (bounded rfind, no slice copy)
+        last_period = text.rfind('.', 0, max_length)
+        last_exclaim = text.rfind('!', 0, max_length)
+        last_question = text.rfind('?', 0, max_length)
         
         last_sentence_end = max(last_period, last_exclaim, last_question)
         
@@ -212,27 +315,19 @@ Just send me an address like:
         else:
             return text[:max_length - 3] + "..."
     
-    def _format_property_details(self, details: str) -> str:
+    def _format_property_details(self, lines: List[str]) -> str:
         """Format property details section"""
-        lines = details.split('\n')
-        formatted_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line and not line.startswith('-'):
-                formatted_lines.append(f"• {line}")
-            elif line.startswith('-'):
-                formatted_lines.append(f"• {line[1:].strip()}")
-        
-        return '\n'.join(formatted_lines[:5])  # Limit lines
+        stripped = (line.strip() for line in lines)
+        # Lines are already stripped, so a leading dash only needs the space after it removed
+        items = (line[1:].lstrip() if line[0] == '-' else line for line in stripped if line)
+        return '\n'.join(f"• {item}" for item in islice(items, 5))  # Limit lines
     
-    def _format_final_estimate(self, estimate: str) -> str:
+    def _format_final_estimate(self, lines: List[str]) -> str:
         """Format final estimate"""
-        lines = estimate.split('\n')
         estimate_line = ""
         
         for line in lines:
-            if '$' in line and ('estimate' in line.lower() or 'final' in line.lower()):
+            if '$' in line and _ESTIMATE_KW_RE.search(line):
                 estimate_line = line.strip()
                 break
         
@@ -245,35 +340,24 @@ Just send me an address like:
         """Format price range"""
         return f"`{price_range.strip()}`"
     
-    def _format_comparable_sales(self, comps: str) -> str:
+    def _format_comparable_sales(self, lines: List[str]) -> str:
         """Format comparable sales (truncated)"""
-        lines = comps.split('\n')
-        formatted = []
-        
-        for line in lines[:3]:  # Limit to 3 comps
-            if line.strip() and '$' in line:
-                formatted.append(f"• {line.strip()}")
+        bullets = _bullets(islice(lines, 3), lambda line: '$' in line, 3)  # Limit to 3 comps
         
         if len(lines) > 3:
-            formatted.append("• _(... and more)_")
+            bullets = chain(bullets, ("• _(... and more)_",))
         
-        return '\n'.join(formatted) if formatted else "No recent comparables found"
+        return '\n'.join(bullets) or "No recent comparables found"
     
-    def _format_market_analysis(self, neighborhood: str, adjustments: str) -> str:
+    def _format_market_analysis(self, neighborhood_lines: List[str]) -> str:
         """Format market analysis section"""
-        key_points = []
-        
         # Extract key points from neighborhood analysis
-        for line in neighborhood.split('\n'):
-            if line.strip() and ('school' in line.lower() or 'crime' in line.lower() or 'median' in line.lower()):
-                key_points.append(f"• {line.strip()}")
-        
-        return '\n'.join(key_points[:3])  # Limit points
+        return '\n'.join(_bullets(neighborhood_lines, _MARKET_KW_RE.search, 3))  # Limit points
     
-    def _format_land_assembly_info(self, adjustments: str) -> str:
+    def _format_land_assembly_info(self, adjustment_lines: List[str]) -> str:
         """Extract and format land assembly information"""
-        for line in adjustments.split('\n'):
-            if 'assembly' in line.lower() or 'premium' in line.lower():
+        for line in adjustment_lines:
+            if _ASSEMBLY_KW_RE.search(line):
                 return f"• {line.strip()}"
         
         return "• Standard market conditions applied"
@@ -281,58 +365,31 @@ Just send me an address like:
     def _format_confidence(self, confidence: float) -> str:
         """Format confidence level"""
         percentage = int(confidence * 100)
-        if percentage >= 80:
-            level = "High"
-            emoji = "🟢"
-        elif percentage >= 60:
-            level = "Medium"
-            emoji = "🟡"
-        else:
-            level = "Low"
-            emoji = "🔴"
-        
-        return f"{emoji} {percentage}% ({level})"
+        if 0 <= percentage <= 100:
+            return _CONFIDENCE_LABELS[percentage]
+        return _confidence_label(percentage)  # Out-of-range score from the LLM
     
     def _get_confidence_emoji(self, confidence: float) -> str:
         """Get emoji based on confidence level"""
-        if confidence >= 0.8:
-            return "🎯"
-        elif confidence >= 0.6:
-            return "📊"
-        else:
-            return "❓"
+        return _confidence_tier(confidence)[0]
     
     def _create_summary_response(self, prediction: Any) -> str:
         """Create a shorter summary response"""
         try:
-            confidence_emoji = self._get_confidence_emoji(prediction.confidence)
-            
-            return f"""🏠 *Property Valuation Summary* {confidence_emoji}
-
-💰 *{self._format_final_estimate(prediction.final_estimate)}*
-
-📊 *Range:* {self._format_price_range(prediction.price_range)}
-
-🔍 *Confidence:* {self._format_confidence(prediction.confidence)}
-
-💡 Full report available - contact for details"""
+            return _SUMMARY_TEMPLATE.format(
+                confidence_emoji=self._get_confidence_emoji(prediction.confidence),
+                final_estimate=self._format_final_estimate(prediction.final_estimate.split('\n')),
+                price_range=self._format_price_range(prediction.price_range),
+                confidence=self._format_confidence(prediction.confidence)
+            )
             
         except Exception:
-            return "📊 Valuation complete - contact for detailed results"
+            return _SUMMARY_FALLBACK
     
     def _format_error_response(self, error: str) -> FormattedResponse:
         """Format error response"""
-        response = f"""❌ *Analysis Error*
-
-Sorry, I encountered an issue processing your request.
-
-*Error:* {error[:100]}...
-
-Please try:
-• Checking the address format
-• Using a more specific address
-• Trying again in a few moments
-
-Type /help for usage examples."""
-
-        return FormattedResponse(text=response)
\ No newline at end of file
+        return FormattedResponse(text=self._format_error_text(error))
+    
+    def _format_error_text(self, error: str) -> str:
+        """Build the error reply text"""
+        return _ERROR_TEMPLATE.format(error=error[:100])
\ No newline at end of file
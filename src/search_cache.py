@@ -0,0 +1,353 @@
+"""
+Caching layer for Tavily searches.
+Repeated queries within and across ReAct traces are served from memory or disk
+instead of making another HTTP round-trip.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# httpx and requests come with tavily, tenacity with DSPy
+import httpx
+import requests
+from tavily.errors import (
+    ForbiddenError, InvalidAPIKeyError, TimeoutError as SearchTimeoutError, UsageLimitExceededError
+)
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential
+
+from config import get_search_client, get_async_search_client, get_cache_config
+from cache_manager import PropertyCache
+
+logger = logging.getLogger(__name__)
+
+# Results stored with a TTL stay in the cache this many times longer; past the TTL they
+# are stale, still returned at once while a background search refreshes them
+_STALE_FACTOR = 4
+
+# Consecutive failed searches that open the circuit, and how long it stays open
+_BREAKER_FAIL_MAX = 5
+_BREAKER_RESET_SECONDS = 30.0
+
+
+class _CircuitBreaker:
+    """Fails searches fast while Tavily is down, instead of every tool waiting out timeouts.
+
+    After fail_max consecutive failures the circuit opens and searches are skipped for
+    reset_seconds; then a single trial search is let through, closing it again on success.
+    A trial that ends any other way reopens it, and one that never reports back is
+    replaced by a new trial after another reset_seconds.
+    """
+
+    def __init__(self, fail_max: int = _BREAKER_FAIL_MAX, reset_seconds: float = _BREAKER_RESET_SECONDS):
+        self.fail_max = fail_max
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        # Sync searches record results from many tool threads
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a search may go upstream now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._opened_at = time.monotonic()  # Times out this trial if it is lost
+                if self.state == 'open':
+                    self._set_state('half-open')
+                return True  # The trial search
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self.state != 'closed':
+                self._set_state('closed')
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half-open' or (self.state == 'closed' and self._failures >= self.fail_max):
+                self._opened_at = time.monotonic()
+                self._set_state('open')
+
+    def record_abort(self):
+        """A search ended without an outcome (e.g. cancelled); a half-open trial reopens the circuit"""
+        with self._lock:
+            if self.state == 'half-open':
+                self._opened_at = time.monotonic()
+                self._set_state('open')
+
+    def _set_state(self, state: str):
+        logger.warning(
+            "Search circuit breaker %s -> %s after %d consecutive failures", self.state, state, self._failures
+        )
+        self.state = state
+
+
+_BREAKER = _CircuitBreaker()
+
+
+class SkippedSearch(list):
+    """The empty result of a search skipped while the circuit is open, so callers can tell
+    it apart from a search that found nothing (and avoid caching answers built on it)"""
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Rate limits, timeouts, connection errors and 5xx responses are worth retrying"""
+    if isinstance(error, (httpx.HTTPStatusError, requests.HTTPError)):
+        return error.response is not None and error.response.status_code >= 500
+    return isinstance(error, (
+        UsageLimitExceededError, SearchTimeoutError, httpx.TransportError, requests.ConnectionError
+    ))
+
+
+def _record_error(error: Exception) -> None:
+    """Count a failed search towards the breaker only if it says Tavily is unhealthy or
+    refusing this deployment. A per-query error, such as a 400 for an over-long query,
+    still means Tavily answered, so one user's bad queries can't open it for everyone."""
+    if _is_transient(error) or isinstance(error, (InvalidAPIKeyError, ForbiddenError)):
+        _BREAKER.record_failure()
+    else:
+        _BREAKER.record_success()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_cache() -> Optional[PropertyCache]:
+    """Build the search cache from the shared cache settings (None when caching is disabled)"""
+    cache_config = get_cache_config()
+    if not cache_config.enable_cache:
+        return None
+
+    # Separate database from property valuations so their stats and clears stay independent
+    return PropertyCache.from_config(cache_config, subdir='search')
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share an entry"""
+    # split() drops leading/trailing runs too; several times faster than a regex substitution
+    return ' '.join(query.lower().split())
+
+
+def get_cache_info() -> dict:
+    """Search cache hit/miss statistics and sizes, shaped like AsyncRealEstateAgent.get_cache_stats()"""
+    cache = _get_cache()
+    if cache is None:
+        return {"cache_enabled": False}
+    return {"cache_enabled": True, **cache.get_cache_info()}
+
+
+def _lookup(query: str, max_results: int):
+    """Return (cache, cache_data, cached entry or None) for a query"""
+    cache = _get_cache()
+    if cache is None:
+        return None, None, None
+    cache_data = {'query': normalize_query(query), 'max_results': max_results}
+    return cache, cache_data, cache.get(cache_data)
+
+
+async def _alookup(query: str, max_results: int):
+    """_lookup for the search loop, with disk reads run on the cache I/O pool"""
+    cache = _get_cache()
+    if cache is None:
+        return None, None, None
+    cache_data = {'query': normalize_query(query), 'max_results': max_results}
+    cached = cache.get_memory(cache_data)
+    if cached is None:
+        if cache.enable_disk_cache:
+            cached = await asyncio.get_running_loop().run_in_executor(_CACHE_IO_POOL, cache.get_disk, cache_data)
+        else:
+            cached = cache.get_disk(cache_data)  # Just counts the miss
+    return cache, cache_data, cached
+
+
+def _store(
+    cache, cache_data: dict, contents: list[str], ttl_seconds: Optional[float], background: bool = False
+) -> None:
+    """Cache a result with its fetch time, kept past ttl_seconds so it can be served stale.
+    With background, the disk write is left to the cache I/O pool."""
+    # Only the text is kept, so entries stay small
+    entry = {'contents': contents, 'fetched_at': time.time()}
+    ttl_override = ttl_seconds * _STALE_FACTOR if ttl_seconds else None
+    cache.set_memory(cache_data, entry, ttl_override)
+    if cache.enable_disk_cache:
+        if background:
+            _CACHE_IO_POOL.submit(cache.set_disk, cache_data, entry, ttl_override)
+        else:
+            cache.set_disk(cache_data, entry, ttl_override)
+
+
+def _is_stale(entry: dict, ttl_seconds: Optional[float]) -> bool:
+    """Whether a cached entry has outlived ttl_seconds (entries without a fetch time never do)"""
+    fetched_at = entry.get('fetched_at')
+    return bool(ttl_seconds) and fetched_at is not None and time.time() - fetched_at > ttl_seconds
+
+
+def cached_search(query: str, max_results: int = 5, ttl_seconds: Optional[float] = None) -> list[str]:
+    """Search Tavily and return the content of each result, caching by normalized query.
+    max_results caps the response server-side, so unused results are never transferred;
+    ttl_seconds overrides the cache's configured TTL for this result, after which it is
+    served stale while refreshed in the background."""
+    cache, cache_data, cached = _lookup(query, max_results)
+    if cached is not None:
+        if _is_stale(cached, ttl_seconds):
+            _search_loop().call_soon_threadsafe(_refresh, query, max_results, ttl_seconds)
+        return cached['contents']
+
+    if not _BREAKER.allow():
+        return SkippedSearch()  # Let the caller carry on with partial data while Tavily recovers
+
+    # The sync client's HTTP adapter already retries transient failures with backoff
+    try:
+        response = get_search_client().search(query, search_depth="basic", max_results=max_results)
+    except Exception as e:
+        _record_error(e)
+        raise
+    except BaseException:
+        _BREAKER.record_abort()
+        raise
+    _BREAKER.record_success()
+    contents = [r["content"] for r in response["results"]]
+    if cache is not None:
+        _store(cache, cache_data, contents, ttl_seconds)
+    return contents
+
+
+_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_LOOP_LOCK = threading.Lock()
+
+# Caps in-flight Tavily requests across all concurrent fan-outs, to stay inside the
+# provider's rate limits; only ever awaited on the background loop
+_SEARCH_SLOTS = asyncio.Semaphore(int(os.getenv('SEARCH_CONCURRENCY', '8')))
+
+# Searches in flight on the background loop, keyed like the cache, so concurrent tools and
+# users asking the same query share one request. Only touched from the loop, so no lock.
+_PENDING: dict[tuple[str, int], asyncio.Future] = {}
+
+# Background refreshes of stale entries; the loop only keeps weak references to tasks
+_REFRESHES: set[asyncio.Task] = set()
+
+# Blocking SQLite reads and writes for the search loop, so one slow disk access doesn't
+# stall every search in flight. Separate from executor.py's pool: agents block there on
+# search_many, so queuing this I/O behind them could deadlock when that pool is saturated.
+_CACHE_IO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="search-cache")
+
+
+def _search_loop() -> asyncio.AbstractEventLoop:
+    """Background event loop that owns the async search client's connections"""
+    global _LOOP
+    if _LOOP is None:
+        with _LOOP_LOCK:
+            if _LOOP is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="tavily-async", daemon=True).start()
+                _LOOP = loop
+    return _LOOP
+
+
+async def _acached_search(query: str, max_results: int, ttl_seconds: Optional[float]) -> list[str]:
+    """Async counterpart of cached_search, run on the background loop"""
+    cache, cache_data, cached = await _alookup(query, max_results)
+    if cached is not None:
+        if _is_stale(cached, ttl_seconds):
+            _refresh(query, max_results, ttl_seconds)
+        return cached['contents']
+    return await _fetch_shared(query, max_results, ttl_seconds, cache, cache_data)
+
+
+async def _fetch_shared(
+    query: str, max_results: int, ttl_seconds: Optional[float], cache, cache_data: Optional[dict]
+) -> list[str]:
+    """Search and cache a query, joining a search already in flight for it"""
+    key = (normalize_query(query), max_results)
+    pending = _PENDING.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    if not _BREAKER.allow():
+        return SkippedSearch()  # Let the caller carry on with partial data while Tavily recovers
+
+    future = asyncio.get_running_loop().create_future()
+    _PENDING[key] = future
+    try:
+        try:
+            async with _SEARCH_SLOTS:
+                response = await _search_with_retry(query, max_results)
+        except Exception as e:
+            _record_error(e)
+            raise
+        except BaseException:  # Cancelled, e.g. a refresh at loop teardown
+            _BREAKER.record_abort()
+            raise
+        _BREAKER.record_success()
+        contents = [r["content"] for r in response["results"]]
+        if cache is not None:
+            _store(cache, cache_data, contents, ttl_seconds, background=True)
+        future.set_result(contents)
+        return contents
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # Mark retrieved so unjoined failures aren't logged twice
+        raise
+    finally:
+        del _PENDING[key]
+
+
+async def _search_with_retry(query: str, max_results: int) -> dict:
+    """Search with the async client, retrying transient failures with exponential backoff"""
+    async for attempt in AsyncRetrying(
+        retry=retry_if_exception(_is_transient),
+        wait=wait_exponential(multiplier=0.3, max=3),
+        stop=stop_after_attempt(3),
+        reraise=True
+    ):
+        with attempt:
+            return await get_async_search_client().search(query, search_depth="basic", max_results=max_results)
+
+
+def _refresh(query: str, max_results: int, ttl_seconds: Optional[float]) -> None:
+    """Re-fetch a stale entry in the background; must be called on the search loop"""
+    normalized = normalize_query(query)
+    if (normalized, max_results) in _PENDING:
+        return  # Already being fetched, which refreshes it
+
+    cache_data = {'query': normalized, 'max_results': max_results}
+    task = asyncio.get_running_loop().create_task(
+        _fetch_shared(query, max_results, ttl_seconds, _get_cache(), cache_data)
+    )
+    _REFRESHES.add(task)
+    task.add_done_callback(_refresh_done)
+
+
+def _refresh_done(task: asyncio.Task) -> None:
+    """Drop a finished refresh; the stale entry stays cached if it failed"""
+    _REFRESHES.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Background search refresh failed: %s", task.exception())
+
+
+async def _gather_searches(
+    queries: list[str], max_results: int, ttl_seconds: Optional[float]
+) -> list[list[str]]:
+    """Issue all searches at once over the shared async client"""
+    return await asyncio.gather(*[_acached_search(q, max_results, ttl_seconds) for q in queries])
+
+
+def search_many(
+    queries: list[str], max_results: int = 5, ttl_seconds: Optional[float] = None
+) -> list[list[str]]:
+    """Search all queries concurrently and return each one's contents, in query order.
+
+    Blocks the calling thread; must not be called from a running event loop.
+    """
+    return asyncio.run_coroutine_threadsafe(_gather_searches(queries, max_results, ttl_seconds), _search_loop()).result()
@@ -4,58 +4,214 @@ Integrates with DSPy real estate agent to provide property estimates.
 """
 
 import asyncio
+import hashlib
+import importlib.util
 import logging
-from datetime import datetime
-from typing import Optional
+import signal
+import time
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Coroutine, List, Optional
 
 from telegram import Update, BotCommand
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
+from telegram.ext import AIORateLimiter, Application, CommandHandler, MessageHandler, filters, ContextTypes
 from telegram.constants import ChatAction
 
-from config import get_telegram_config
+from config import get_cache_config, get_telegram_config, setup_logging
 from message_parser import MessageParser, PropertyQuery
 from response_formatter import ResponseFormatter
 from async_agent import AsyncRealEstateAgent
-from market_agent import create_market_intelligence_agent
+from executor import run_sync
+from market_agent import create_market_intelligence_agent, run_market_intelligence
+from search_cache import get_cache_info as get_search_cache_info
+from tools import (
+    get_market_competition_analysis, get_market_velocity_analysis, get_neighborhood_stats, prefetch_signals
+)
 
 
 # Configure logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Telegram allows ~30 messages/second per bot; leave headroom so bursts queue instead of hitting 429s
+_MAX_SENDS_PER_SECOND = 28
+
+# How long a health probe result is reused by /health and /stats
+_HEALTH_TTL_SECONDS = 5.0
+
+# Background re-valuation of frequently requested addresses, so their cached results stay warm
+_PREFETCH_INTERVAL_SECONDS = 300
+_PREFETCH_TOP_K = 20
+_PREFETCH_MIN_REQUESTS = 2  # An address must be asked for this often to count as popular
+_PREFETCH_CONCURRENCY = 2
+
+# Area-level tools each command's agent always calls, started speculatively on the search
+# pool as soon as the address is parsed, while the status message is sent and the agent starts
+_VALUATION_SPECULATIVE_TOOLS = (get_neighborhood_stats,)
+_MARKET_SPECULATIVE_TOOLS = (
+    get_neighborhood_stats, get_market_velocity_analysis, get_market_competition_analysis
+)
+
+# How long stop() waits for in-flight handlers and sends to finish
+_DRAIN_TIMEOUT_SECONDS = 5.0
+
+# Bot API connection pool: enough keep-alive connections for a burst of sends at the rate limit,
+# and bursts wait for a free connection instead of failing after PTB's default 1s pool timeout
+_TELEGRAM_POOL_SIZE = 64
+_TELEGRAM_POOL_TIMEOUT_SECONDS = 10.0
+
+# Plain text messages (not commands) are property queries
+_PROPERTY_QUERY_FILTER = filters.TEXT & ~filters.COMMAND
+
+_BOT_COMMANDS = (
+    BotCommand("start", "Start the bot"),
+    BotCommand("help", "Show help message"),
+    BotCommand("stats", "Show bot statistics"),
+    BotCommand("health", "Check bot health"),
+    BotCommand("cache", "Show cache information"),
+    BotCommand("clearcache", "Clear all cached data"),
+    BotCommand("market", "Deep market intelligence analysis"),
+)
+
+# Digest of the command list last registered with Telegram, kept next to the disk cache
+_COMMANDS_HASH_FILE = "bot_commands.hash"
+
+_WELCOME_MESSAGE = """🏠 *Welcome to Real Estate Valuation Bot!*
+
+I can help you estimate property values using advanced AI analysis.
+
+*How to use:*
+Just send me an address like:
+• "What's 123 Main Street, City worth?"
+• "Estimate 456 Oak Avenue, Suburb, STATE 1234"
+
+*Features:*
+✅ Individual property valuations
+✅ Adjacent property combinations  
+✅ Neighborhood analysis
+✅ Confidence scoring
+
+Type /help for more information!"""
+
+# Reply templates, filled with format_map so each command builds one context dict
+_STATS_TEMPLATE = """📊 *Bot Statistics*
+
+⏰ *Uptime:* {uptime}
+📈 *Requests Processed:* {requests_processed}
+🔧 *Agent Status:* {agent_status}
+
+💾 *Cache Performance:*{cache_section}
+
+🕒 *Last Updated:* {updated_at}"""
+
+_STATS_CACHE_SECTION = """
+• Hit Rate: {hit_rate:.1%}
+• Total Requests: {total_requests}
+• Memory Cache: {memory_size}/{memory_max_size}
+• Disk Cache: {disk_size} files ({disk_size_mb} MB)"""
+
+_STATS_CACHE_DISABLED = "\n• Cache: Disabled"
+
+_CACHE_TEMPLATE = """💾 *Cache Information*
+
+📊 *Performance:*
+• Hit Rate: {hit_rate:.1%}
+• Total Requests: {total_requests}
+• Cache Hits: {hits}
+• Cache Misses: {misses}
+
+🧠 *Memory Cache:*
+• Entries: {memory_size}/{memory_max_size}
+• TTL: {memory_ttl_hours} hours
+
+💿 *Disk Cache:*
+• Files: {disk_size}
+• Size: {disk_size_mb} MB
+• TTL: {disk_ttl_days} days
+
+⏱️ *Uptime:* {uptime}{search_section}"""
+
+_CACHE_SEARCH_SECTION = """
+
+🔎 *Search Cache:*
+• Hit Rate: {hit_rate:.1%}
+• Searches: {total_requests}
+• Entries: {memory_size} in memory, {disk_size} on disk"""
+
+_CACHE_CLEARED_TEMPLATE = """🗑️ *Cache Cleared*
+
+Removed:
+• Memory entries: {memory_entries}
+• Disk files: {disk_entries}
+
+Cache has been completely cleared."""
+
+_CACHE_CLEAR_FAILED_TEMPLATE = "❌ Cache clear failed: {reason}"
+
+
+def _rate_limiter() -> Optional[AIORateLimiter]:
+    """Throttle for every outgoing Bot API call, when the rate-limiter extra (aiolimiter) is installed"""
+    if importlib.util.find_spec('aiolimiter') is None:
+        logger.info("aiolimiter not installed; outgoing messages are not rate limited")
+        return None
+    return AIORateLimiter(overall_max_rate=_MAX_SENDS_PER_SECOND, overall_time_period=1)
+
 
 class RealEstateBot:
     """Telegram bot for real estate valuations"""
     
-    def __init__(self):
+    def __init__(self, agent: Optional[AsyncRealEstateAgent] = None):
         self.config = get_telegram_config()
         self.parser = MessageParser()
         self.formatter = ResponseFormatter()
-        self.agent = AsyncRealEstateAgent()
+        self.agent = agent or AsyncRealEstateAgent()
         self.market_agent = None  # Will be initialized when needed
         self.app: Optional[Application] = None
         
         # Statistics
         self.requests_processed = 0
         self.start_time = datetime.now()
+        self._start_monotonic = time.monotonic()  # Uptime clock; immune to wall-clock changes
+        
+        # Last health probe as (monotonic timestamp, healthy); the lock lets one caller probe at a time
+        self._health_cache = (float('-inf'), False)
+        self._health_lock = asyncio.Lock()
+        
+        # Requests per address, decayed each prefetch cycle so it tracks recent popularity
+        self._popular: Counter = Counter()
+        self._prefetch_task: Optional[asyncio.Task] = None
     
     async def initialize(self):
         """Initialize the bot and agent"""
-        if not self.config['token']:
+        if not self.config.token:
             raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
         
         # Initialize the agent
         await self.agent.initialize()
         
         # Create application
-        self.app = Application.builder().token(self.config['token']).build()
+        builder = (
+            Application.builder()
+            .token(self.config.token)
+            .connection_pool_size(_TELEGRAM_POOL_SIZE)
+            .pool_timeout(_TELEGRAM_POOL_TIMEOUT_SECONDS)
+            # HTTP/2 multiplexes concurrent sends over one connection when h2 is installed
+            .http_version("2" if importlib.util.find_spec('h2') is not None else "1.1")
+        )
+        rate_limiter = _rate_limiter()
+        if rate_limiter is not None:
+            builder = builder.rate_limiter(rate_limiter)
+        self.app = builder.build()
         
         # Add handlers
         await self._setup_handlers()
         
+        # Prefetching only pays off when results are cached for the next user
+        if self.agent.cache_enabled and self._prefetch_task is None:
+            self._prefetch_task = asyncio.create_task(self._prefetch_loop())
+        
         logger.info("Bot initialized successfully")
     
     async def _setup_handlers(self):
@@ -70,44 +226,38 @@ class RealEstateBot:
         self.app.add_handler(CommandHandler("market", self.market_command))
         
         # Message handler for property queries
-        self.app.add_handler(MessageHandler(
-            filters.TEXT & ~filters.COMMAND, 
-            self.handle_message
-        ))
+        self.app.add_handler(MessageHandler(_PROPERTY_QUERY_FILTER, self.handle_message))
+        
+        await self._register_commands()
+    
+    async def _register_commands(self):
+        """Set the bot's command menu, skipping the round-trip when Telegram already has this list"""
+        # The bot id (the token's public prefix) is hashed in, so a different bot still gets its menu
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(self.config.token.split(':', 1)[0].encode())
+        for command in _BOT_COMMANDS:
+            digest.update(f"\0{command.command}\0{command.description}".encode())
+        current = digest.hexdigest()
         
-        # Set bot commands
-        commands = [
-            BotCommand("start", "Start the bot"),
-            BotCommand("help", "Show help message"),
-            BotCommand("stats", "Show bot statistics"),
-            BotCommand("health", "Check bot health"),
-            BotCommand("cache", "Show cache information"),
-            BotCommand("clearcache", "Clear all cached data"),
-            BotCommand("market", "Deep market intelligence analysis"),
-        ]
-        await self.app.bot.set_my_commands(commands)
+        hash_path = Path(get_cache_config().disk_cache_dir) / _COMMANDS_HASH_FILE
+        try:
+            if hash_path.read_text() == current:
+                logger.info("Bot commands unchanged; skipping set_my_commands")
+                return
+        except OSError:
+            pass
+        
+        await self.app.bot.set_my_commands(_BOT_COMMANDS)
+        try:
+            hash_path.parent.mkdir(parents=True, exist_ok=True)
+            hash_path.write_text(current)
+        except OSError as e:
+            logger.warning(f"Could not persist bot command hash: {e}")
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
-        welcome_message = """🏠 *Welcome to Real Estate Valuation Bot!*
-
-I can help you estimate property values using advanced AI analysis.
-
-*How to use:*
-Just send me an address like:
-• "What's 123 Main Street, City worth?"
-• "Estimate 456 Oak Avenue, Suburb, STATE 1234"
-
-*Features:*
-✅ Individual property valuations
-✅ Adjacent property combinations  
-✅ Neighborhood analysis
-✅ Confidence scoring
-
-Type /help for more information!"""
-
         await update.message.reply_text(
-            welcome_message,
+            _WELCOME_MESSAGE,
             parse_mode="Markdown"
         )
     
@@ -121,31 +271,31 @@ Type /help for more information!"""
     
     async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /stats command"""
-        uptime = datetime.now() - self.start_time
-        uptime_str = str(uptime).split('.')[0]  # Remove microseconds
+        uptime_str = str(timedelta(seconds=int(time.monotonic() - self._start_monotonic)))
         
-        agent_healthy = await self.agent.health_check()
+        agent_healthy = await self._cached_health()
         cache_stats = self.agent.get_cache_stats()
         
-        stats_message = f"""📊 *Bot Statistics*
-
-⏰ *Uptime:* {uptime_str}
-📈 *Requests Processed:* {self.requests_processed}
-🔧 *Agent Status:* {'✅ Healthy' if agent_healthy else '❌ Unhealthy'}
-
-💾 *Cache Performance:*"""
-
         if cache_stats.get('cache_enabled', False):
             cache_info = cache_stats.get('statistics', {})
-            stats_message += f"""
-• Hit Rate: {cache_info.get('hit_rate', 0):.1%}
-• Total Requests: {cache_info.get('total_requests', 0)}
-• Memory Cache: {cache_stats['memory_cache']['size']}/{cache_stats['memory_cache']['max_size']}
-• Disk Cache: {cache_stats['disk_cache']['size']} files ({cache_stats['disk_cache']['size_mb']} MB)"""
+            cache_section = _STATS_CACHE_SECTION.format_map({
+                'hit_rate': cache_info.get('hit_rate', 0),
+                'total_requests': cache_info.get('total_requests', 0),
+                'memory_size': cache_stats['memory_cache']['size'],
+                'memory_max_size': cache_stats['memory_cache']['max_size'],
+                'disk_size': cache_stats['disk_cache']['size'],
+                'disk_size_mb': cache_stats['disk_cache']['size_mb'],
+            })
         else:
-            stats_message += "\n• Cache: Disabled"
+            cache_section = _STATS_CACHE_DISABLED
 
-        stats_message += f"\n\n🕒 *Last Updated:* {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        stats_message = _STATS_TEMPLATE.format_map({
+            'uptime': uptime_str,
+            'requests_processed': self.requests_processed,
+            'agent_status': '✅ Healthy' if agent_healthy else '❌ Unhealthy',
+            'cache_section': cache_section,
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        })
 
         await update.message.reply_text(
             stats_message,
@@ -154,7 +304,7 @@ Type /help for more information!"""
     
     async def health_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /health command"""
-        agent_healthy = await self.agent.health_check()
+        agent_healthy = await self._cached_health()
         
         if agent_healthy:
             await update.message.reply_text("✅ Bot is healthy and ready!")
@@ -173,44 +323,51 @@ Type /help for more information!"""
         memory_cache = cache_stats.get('memory_cache', {})
         disk_cache = cache_stats.get('disk_cache', {})
         
-        cache_message = f"""💾 *Cache Information*
-
-📊 *Performance:*
-• Hit Rate: {cache_info.get('hit_rate', 0):.1%}
-• Total Requests: {cache_info.get('total_requests', 0)}
-• Cache Hits: {cache_info.get('hits', 0)}
-• Cache Misses: {cache_info.get('misses', 0)}
-
-🧠 *Memory Cache:*
-• Entries: {memory_cache.get('size', 0)}/{memory_cache.get('max_size', 0)}
-• TTL: {memory_cache.get('ttl_hours', 0)} hours
-
-💿 *Disk Cache:*
-• Files: {disk_cache.get('size', 0)}
-• Size: {disk_cache.get('size_mb', 0)} MB
-• TTL: {disk_cache.get('ttl_days', 0)} days
-
-⏱️ *Uptime:* {cache_info.get('uptime', 'Unknown')}"""
+        cache_message = _CACHE_TEMPLATE.format_map({
+            'hit_rate': cache_info.get('hit_rate', 0),
+            'total_requests': cache_info.get('total_requests', 0),
+            'hits': cache_info.get('hits', 0),
+            'misses': cache_info.get('misses', 0),
+            'memory_size': memory_cache.get('size', 0),
+            'memory_max_size': memory_cache.get('max_size', 0),
+            'memory_ttl_hours': memory_cache.get('ttl_hours', 0),
+            'disk_size': disk_cache.get('size', 0),
+            'disk_size_mb': disk_cache.get('size_mb', 0),
+            'disk_ttl_days': disk_cache.get('ttl_days', 0),
+            'uptime': cache_info.get('uptime', 'Unknown'),
+            'search_section': self._search_cache_section(),
+        })
 
         await update.message.reply_text(
             cache_message,
             parse_mode="Markdown"
         )
     
+    @staticmethod
+    def _search_cache_section() -> str:
+        """Search cache lines for /cache; empty when search caching is disabled"""
+        search_stats = get_search_cache_info()
+        if not search_stats.get('cache_enabled', False):
+            return ""
+        search_info = search_stats.get('statistics', {})
+        return _CACHE_SEARCH_SECTION.format_map({
+            'hit_rate': search_info.get('hit_rate', 0),
+            'total_requests': search_info.get('total_requests', 0),
+            'memory_size': search_stats['memory_cache']['size'],
+            'disk_size': search_stats['disk_cache']['size'],
+        })
+    
     async def clear_cache_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /clearcache command"""
         result = self.agent.clear_cache()
         
         if result.get('cleared', False):
-            message = f"""🗑️ *Cache Cleared*
-
-Removed:
-• Memory entries: {result.get('memory_entries', 0)}
-• Disk files: {result.get('disk_entries', 0)}
-
-Cache has been completely cleared."""
+            message = _CACHE_CLEARED_TEMPLATE.format_map({
+                'memory_entries': result.get('memory_entries', 0),
+                'disk_entries': result.get('disk_entries', 0),
+            })
         else:
-            message = f"❌ Cache clear failed: {result.get('reason', 'Unknown error')}"
+            message = _CACHE_CLEAR_FAILED_TEMPLATE.format_map({'reason': result.get('reason', 'Unknown error')})
         
         await update.message.reply_text(
             message,
@@ -219,9 +376,10 @@ Cache has been completely cleared."""
     
     async def market_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /market command for deep market intelligence analysis"""
+        speculative = []
         try:
             # Check if user is allowed (if restrictions are set)
-            if self.config['allowed_users'] and str(update.effective_user.id) not in self.config['allowed_users']:
+            if self.config.allowed_users and str(update.effective_user.id) not in self.config.allowed_users:
                 await update.message.reply_text(
                     "❌ Sorry, you're not authorized to use this bot."
                 )
@@ -260,24 +418,25 @@ Cache has been completely cleared."""
                 return
             
             address = query.addresses[0]  # Use first address for market analysis
-            
-            # Send processing message
-            processing_message = await update.message.reply_text(
-                f"📊 **Market Intelligence Analysis**\n\n"
-                f"🔍 Analyzing market data for:\n`{address}`\n\n"
-                f"⏳ This comprehensive analysis includes:\n"
-                f"• Price history research\n"
-                f"• Market trends analysis\n"
-                f"• Competition assessment\n"
-                f"• Predictions & insights\n\n"
-                f"⏱️ Please wait 2-3 minutes...",
-                parse_mode="Markdown"
-            )
-            
-            # Show typing indicator
-            await context.bot.send_chat_action(
-                chat_id=update.effective_chat.id,
-                action=ChatAction.TYPING
+            speculative = self._speculate([address], _MARKET_SPECULATIVE_TOOLS)
+            
+            # Send processing message and show typing indicator in parallel
+            processing_message, _ = await asyncio.gather(
+                update.message.reply_text(
+                    f"📊 **Market Intelligence Analysis**\n\n"
+                    f"🔍 Analyzing market data for:\n`{address}`\n\n"
+                    f"⏳ This comprehensive analysis includes:\n"
+                    f"• Price history research\n"
+                    f"• Market trends analysis\n"
+                    f"• Competition assessment\n"
+                    f"• Predictions & insights\n\n"
+                    f"⏱️ Please wait 2-3 minutes...",
+                    parse_mode="Markdown"
+                ),
+                context.bot.send_chat_action(
+                    chat_id=update.effective_chat.id,
+                    action=ChatAction.TYPING
+                )
             )
             
             # Initialize market agent if needed
@@ -287,24 +446,19 @@ Cache has been completely cleared."""
             # Run market analysis
             question = f"Provide comprehensive market intelligence analysis for {address}"
             
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_event_loop()
-            from concurrent.futures import ThreadPoolExecutor
-            executor = ThreadPoolExecutor(max_workers=1)
-            
-            prediction = await loop.run_in_executor(
-                executor,
-                lambda: self.market_agent(question=question)
-            )
+            # Run on the shared pool to avoid blocking; contextvars (dspy.context) carry over
+            prediction = await run_sync(run_market_intelligence, self.market_agent, question, address)
             
             # Format the response
             response = self.formatter.format_market_intelligence(prediction, address)
             
-            # Delete processing message and send results
-            await processing_message.delete()
-            await update.message.reply_text(
-                response.text,
-                parse_mode=response.parse_mode
+            # Delete processing message and send results in parallel
+            await asyncio.gather(
+                self._delete_quietly(processing_message),
+                update.message.reply_text(
+                    response.text,
+                    parse_mode=response.parse_mode
+                )
             )
             
             # Update statistics
@@ -329,12 +483,16 @@ Cache has been completely cleared."""
                 f"Error: {str(e)[:100]}...",
                 parse_mode="Markdown"
             )
+        finally:
+            for future in speculative:
+                future.cancel()  # Drops any still queued
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming text messages"""
+        speculative = []
         try:
             # Check if user is allowed (if restrictions are set)
-            if self.config['allowed_users'] and str(update.effective_user.id) not in self.config['allowed_users']:
+            if self.config.allowed_users and str(update.effective_user.id) not in self.config.allowed_users:
                 await update.message.reply_text(
                     "❌ Sorry, you're not authorized to use this bot."
                 )
@@ -369,18 +527,20 @@ Cache has been completely cleared."""
             
             # Update query with only valid addresses
             query.addresses = valid_addresses
+            self._popular.update(valid_addresses)
+            speculative = self._speculate(valid_addresses, _VALUATION_SPECULATIVE_TOOLS)
             
-            # Send processing message
+            # Send processing message and show typing indicator; independent calls, so in parallel
             processing_response = self.formatter.format_processing_message(valid_addresses)
-            processing_message = await update.message.reply_text(
-                processing_response.text,
-                parse_mode=processing_response.parse_mode
-            )
-            
-            # Show typing indicator
-            await context.bot.send_chat_action(
-                chat_id=update.effective_chat.id,
-                action=ChatAction.TYPING
+            processing_message, _ = await asyncio.gather(
+                update.message.reply_text(
+                    processing_response.text,
+                    parse_mode=processing_response.parse_mode
+                ),
+                context.bot.send_chat_action(
+                    chat_id=update.effective_chat.id,
+                    action=ChatAction.TYPING
+                )
             )
             
             # Process the request
@@ -396,6 +556,16 @@ Cache has been completely cleared."""
                 error_response.text,
                 parse_mode=error_response.parse_mode
             )
+        finally:
+            for future in speculative:
+                future.cancel()  # Drops any still queued, e.g. after a cached answer
+    
+    def _speculate(self, addresses: List[str], tools) -> List[Future]:
+        """Start area-level searches ahead of the agent. Outside a search scope their results
+        are only kept by the search cache, so with caching off this would just double searches."""
+        if not self.agent.cache_enabled:
+            return []
+        return prefetch_signals(addresses, tools)
     
     async def _process_property_request(self, update: Update, query: PropertyQuery, processing_message):
         """Process the property valuation request"""
@@ -409,11 +579,13 @@ Cache has been completely cleared."""
             else:
                 response = self.formatter.format_property_valuation(prediction)
             
-            # Delete processing message and send results
-            await processing_message.delete()
-            await update.message.reply_text(
-                response.text,
-                parse_mode=response.parse_mode
+            # Delete processing message and send results in parallel
+            await asyncio.gather(
+                self._delete_quietly(processing_message),
+                update.message.reply_text(
+                    response.text,
+                    parse_mode=response.parse_mode
+                )
             )
             
             logger.info(f"Successfully processed request for {len(query.addresses)} properties")
@@ -434,6 +606,79 @@ Cache has been completely cleared."""
                 parse_mode=error_response.parse_mode
             )
     
+    async def _cached_health(self) -> bool:
+        """Agent health, probed at most once per _HEALTH_TTL_SECONDS"""
+        async with self._health_lock:
+            checked_at, healthy = self._health_cache
+            now = time.monotonic()
+            if now - checked_at >= _HEALTH_TTL_SECONDS:
+                healthy = await self.agent.health_check()
+                self._health_cache = (now, healthy)
+            return healthy
+    
+    async def _prefetch_loop(self):
+        """Periodically re-run valuations for popular addresses so they are served from cache.
+        Still-cached addresses are cache hits, so only expired entries cost an agent run."""
+        slots = asyncio.Semaphore(_PREFETCH_CONCURRENCY)
+        
+        async def prefetch(address: str):
+            async with slots:
+                try:
+                    await self.agent.analyze_property(
+                        PropertyQuery(addresses=[address], query_type='single', raw_message=address)
+                    )
+                except Exception as e:
+                    logger.warning(f"Prefetch failed for {address}: {e}")
+        
+        while True:
+            await asyncio.sleep(_PREFETCH_INTERVAL_SECONDS)
+            popular = [a for a, n in self._popular.most_common(_PREFETCH_TOP_K) if n >= _PREFETCH_MIN_REQUESTS]
+            # Halve the counts so addresses nobody asks for anymore age out
+            self._popular = Counter({a: n // 2 for a, n in self._popular.items() if n > 1})
+            if popular:
+                logger.info(f"Prefetching {len(popular)} popular addresses")
+                await asyncio.gather(*(prefetch(a) for a in popular))
+    
+    @staticmethod
+    async def _delete_quietly(message):
+        """Delete a status message; failing to (e.g. already deleted) must not fail the reply"""
+        try:
+            await message.delete()
+        except Exception as e:
+            logger.warning(f"Could not delete status message: {e}")
+    
+    @staticmethod
+    async def _wait_for_stop_signal():
+        """Block until SIGTERM (container shutdown) or SIGINT, so stop() runs either way"""
+        loop = asyncio.get_running_loop()
+        stop_requested = asyncio.Event()
+        signals = (signal.SIGTERM, signal.SIGINT)
+        try:
+            for sig in signals:
+                loop.add_signal_handler(sig, stop_requested.set)
+        except NotImplementedError:
+            # Windows event loops have no signal handlers; Ctrl+C still raises KeyboardInterrupt
+            pass
+        try:
+            await stop_requested.wait()
+            logger.info("Stopping bot...")
+        finally:
+            for sig in signals:
+                try:
+                    loop.remove_signal_handler(sig)
+                except NotImplementedError:
+                    pass
+    
+    @staticmethod
+    async def _drain_tasks():
+        """Give in-flight handlers and sends up to _DRAIN_TIMEOUT_SECONDS to finish"""
+        pending = asyncio.all_tasks() - {asyncio.current_task()}
+        if not pending:
+            return
+        _, still_pending = await asyncio.wait(pending, timeout=_DRAIN_TIMEOUT_SECONDS)
+        if still_pending:
+            logger.warning(f"{len(still_pending)} tasks still running after shutdown timeout")
+    
     async def start_polling(self):
         """Start the bot with polling"""
         if not self.app:
@@ -442,11 +687,12 @@ Cache has been completely cleared."""
         logger.info("Starting bot with polling...")
         await self.app.initialize()
         await self.app.start()
-        await self.app.updater.start_polling()
+        # Long-poll for up to 30s per request and skip updates queued while offline
+        await self.app.updater.start_polling(timeout=30, drop_pending_updates=True)
         
         try:
             # Keep the bot running
-            await asyncio.Event().wait()
+            await self._wait_for_stop_signal()
         except KeyboardInterrupt:
             logger.info("Stopping bot...")
         finally:
@@ -474,7 +720,7 @@ Cache has been completely cleared."""
         )
         
         try:
-            await asyncio.Event().wait()
+            await self._wait_for_stop_signal()
         except KeyboardInterrupt:
             logger.info("Stopping bot...")
         finally:
@@ -482,25 +728,58 @@ Cache has been completely cleared."""
     
     async def stop(self):
         """Stop the bot and cleanup resources"""
+        # Long-lived workers never finish on their own, so stop them before draining;
+        # cleanup() cancels the agent's batch dispatcher
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            await asyncio.gather(self._prefetch_task, return_exceptions=True)
+            self._prefetch_task = None
+        self.agent.cleanup()
+        
         if self.app:
             await self.app.updater.stop()
             await self.app.stop()
+            # Let remaining sends finish while the bot's HTTP client is still open
+            await self._drain_tasks()
             await self.app.shutdown()
         
-        self.agent.cleanup()
         logger.info("Bot stopped")
 
 
-async def main():
-    """Main function to run the bot"""
-    bot = RealEstateBot()
+def _loop_factory() -> Optional[Callable[[], asyncio.AbstractEventLoop]]:
+    """uvloop's event loop when installed (faster socket I/O for the bot's many concurrent
+    API calls), otherwise None for asyncio's default loop"""
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+
+def run(coro: Coroutine[Any, Any, Any]) -> Any:
+    """asyncio.run(coro) on the fastest available event loop"""
+    with asyncio.Runner(loop_factory=_loop_factory()) as runner:
+        return runner.run(coro)
+
+
+async def main(mode: Optional[str] = None, agent: Optional[AsyncRealEstateAgent] = None):
+    """Main function to run the bot.
+    
+    mode is "webhook" or "polling"; when omitted, webhook is used if a webhook URL is configured.
+    agent is an already-initialized agent to reuse; when omitted, the bot creates its own.
+    """
+    bot = RealEstateBot(agent=agent)
     
     # Check if webhook configuration is provided
-    webhook_url = bot.config.get('webhook_url')
+    webhook_url = bot.config.webhook_url
+    if mode is None:
+        mode = "webhook" if webhook_url else "polling"
     
-    if webhook_url:
+    if mode == "webhook":
+        if not webhook_url:
+            raise ValueError("Webhook mode requires TELEGRAM_WEBHOOK_URL to be set")
         # Run with webhook
-        webhook_port = bot.config.get('webhook_port', 8443)
+        webhook_port = bot.config.webhook_port
         await bot.start_webhook(webhook_url, webhook_port)
     else:
         # Run with polling
@@ -508,4 +787,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run(main())
\ No newline at end of file
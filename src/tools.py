@@ -3,253 +3,500 @@ Tool functions for DSPy real estate agent.
 Contains all specialized search and data gathering tools.
 """
 
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
 from datetime import datetime
-from config import get_search_client
+from typing import Iterable, Iterator, Optional, Sequence
+from search_cache import SkippedSearch, cached_search, normalize_query, search_many
 
-# Initialize search client
-search_client = get_search_client()
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used otherwise
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# How long each kind of search result stays cached; web_search keeps the configured TTL
+_RECORDS_TTL_SECONDS = 6 * 3600  # Tax records, school ratings and crime data change slowly
+_MARKET_TTL_SECONDS = 3600       # Listings, sales and market stats move daily
+
+# Tool output goes straight into the LM prompt; beyond this many characters the extra
+# snippets mostly repeat earlier ones and only add prompt tokens and latency
+_MAX_TOOL_OUTPUT_CHARS = 20_000
+
+# The long query lists are searched in waves of this many queries; once a wave adds few
+# snippets not already seen, the area is covered and the remaining queries are skipped
+_WAVE_SIZE = 5
+_SATURATED_MIN_SNIPPETS = 15   # Never stop before this many distinct snippets
+_SATURATED_NEW_RATIO = 0.15    # ...and only when a wave's share of new snippets is below this
+
+# Searches made during the current agent run, {(query, max_results): contents}; None outside with_search_scope
+_search_cache: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar('_search_cache', default=None)
+
+# Set when a search inside track_skipped_searches() was skipped by the search circuit breaker;
+# shared by the contexts copied into prewarm threads, hence an Event rather than a bool
+_skipped_searches: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    '_skipped_searches', default=None
+)
+
+
+def with_search_scope(program):
+    """Wrap an agent so each call gets a fresh request-scoped search cache.
+    Tool calls within one run then never repeat a query, even with caching disabled."""
+    def run(*args, **kwargs):
+        token = _search_cache.set({})
+        try:
+            return program(*args, **kwargs)
+        finally:
+            _search_cache.reset(token)
+    return run
+
+
+@contextmanager
+def track_skipped_searches() -> Iterator[threading.Event]:
+    """Yield an event that is set if any search in this block was skipped because the
+    search circuit was open. Answers built on such runs lack data and shouldn't be cached long."""
+    event = threading.Event()
+    token = _skipped_searches.set(event)
+    try:
+        yield event
+    finally:
+        _skipped_searches.reset(token)
+
+
+def _skipped(contents: list[str]) -> bool:
+    """Whether a search result was skipped by the circuit breaker, noting it for the tracker"""
+    if not isinstance(contents, SkippedSearch):
+        return False
+    event = _skipped_searches.get()
+    if event is not None:
+        event.set()
+    return True
+
+
+def _search_once(query: str, max_results: int = 5) -> list[str]:
+    """Search, reusing any result already fetched during the current agent run"""
+    cache = _search_cache.get()
+    key = (query, max_results)
+    if cache is not None and key in cache:
+        return cache[key]
+    contents = cached_search(query, max_results)
+    # A skipped search is tried again on the next call rather than pinned empty for the run
+    if cache is not None and not _skipped(contents):
+        cache[key] = contents
+    return contents
 
 
 def web_search(query: str) -> list[str]:
     """Run a web search and return the content from the top 5 search results"""
-    response = search_client.search(query)
-    return [r["content"] for r in response["results"]]
+    return _search_once(query, max_results=5)
+
+
+def _fetch(
+    queries: list[str], per_query_limit: int, ttl_seconds: Optional[float]
+) -> Iterable[list[str]]:
+    """Search queries concurrently, reusing results already fetched during the current agent run"""
+    # Tavily returns at most per_query_limit results, so nothing needs slicing here
+    cache = _search_cache.get()
+    if cache is None:
+        found = search_many(queries, per_query_limit, ttl_seconds)
+        for contents in found:
+            _skipped(contents)
+        return found
+    
+    # Only fetch queries this agent run hasn't already made
+    missing = [q for q in queries if (q, per_query_limit) not in cache]
+    skipped = {}
+    if missing:
+        for q, contents in zip(missing, search_many(missing, per_query_limit, ttl_seconds)):
+            # Skipped searches aren't kept, so a later call in this run tries them again
+            if _skipped(contents):
+                skipped[q] = contents
+            else:
+                cache[(q, per_query_limit)] = contents
+    # Consumed once by _iter_search, so stream the lookups instead of building a list
+    return (skipped[q] if q in skipped else cache[(q, per_query_limit)] for q in queries)
+
+
+def _iter_search(
+    queries: Sequence[str], per_query_limit: int, ttl_seconds: Optional[float] = None,
+    wave_size: Optional[int] = None
+) -> Iterator[tuple[str, str]]:
+    """Run searches concurrently and yield (query, result) for each distinct result among
+    the top results of each query, in query order.
+
+    With wave_size, queries are searched that many at a time, stopping early once a wave
+    turns up mostly snippets already seen. Waves are also only fetched as the caller
+    consumes results, so a caller that stops reading skips the remaining searches.
+    """
+    # Queries differing only in case/whitespace (e.g. an empty suburb) are searched once
+    unique = {}
+    for q in queries:
+        unique.setdefault(normalize_query(q), q)
+    queries = list(unique.values())
+    
+    step = wave_size or len(queries) or 1
+    # Overlapping queries often return the same page; feed the LLM each snippet once.
+    # A plain set of the snippets themselves: str caches its hash and the set only holds
+    # references, so this beats hashing each snippet into a fingerprint first.
+    seen: set[str] = set()
+    for start in range(0, len(queries), step):
+        new = total = 0
+        wave = queries[start:start + step]
+        for query, contents in zip(wave, _fetch(wave, per_query_limit, ttl_seconds)):
+            for content in contents:
+                total += 1
+                if content not in seen:
+                    seen.add(content)
+                    new += 1
+                    yield query, content
+        if len(seen) >= _SATURATED_MIN_SNIPPETS and new < _SATURATED_NEW_RATIO * total:
+            logger.debug("Search results saturated after %d of %d queries", start + step, len(queries))
+            return
+
+
+def _to_json(data) -> str:
+    """Serialize to compact JSON text, keeping non-ASCII snippets as they are"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def _multi_search(
+    queries: Sequence[str], per_query_limit: int = 2, ttl_seconds: Optional[float] = None,
+    max_chars: int = _MAX_TOOL_OUTPUT_CHARS, wave_size: Optional[int] = None
+) -> str:
+    """Run searches concurrently and return the results as compact JSON,
+    [{"q": query, "r": [result, ...]}, ...] in query order (queries with no new results
+    are left out), keeping snippets until the next one would take it past about max_chars"""
+    groups = []
+    remaining = max_chars
+    for query, content in _iter_search(queries, per_query_limit, ttl_seconds, wave_size):
+        # Quotes and separators around each string; escapes are not counted
+        cost = len(content) + 3
+        new_group = not groups or groups[-1]["q"] != query
+        if new_group:
+            cost += len(query) + 14
+        remaining -= cost
+        if remaining < 0:
+            break
+        if new_group:
+            groups.append({"q": query, "r": []})
+        groups[-1]["r"].append(content)
+    return _to_json(groups)
+
+
+# Query templates for the single-address tools, filled in with the address per call
+QUERY_TEMPLATES = {
+    "tax": (
+        "{address} property tax assessment",
+        "{address} property tax records",
+        "{address} assessed value tax history",
+    ),
+    "neighborhood": (
+        "{address} neighborhood median home prices",
+        "{address} area real estate market trends",
+        "{address} housing market statistics",
+    ),
+    "schools": (
+        "{address} school district ratings",
+        "{address} elementary middle high school scores",
+        "{address} school quality ratings",
+    ),
+    "crime": (
+        "{address} crime statistics",
+        "{address} neighborhood safety crime rates",
+        "{address} area crime data",
+    ),
+}
+
+
+# Comparable-sales queries, filled in per call from the address and its parsed location parts
+_COMPS_TEMPLATES = (
+    # Recent sales - primary searches
+    "{address} recent sales comparable properties",
+    "{address} recently sold homes similar properties",
+    "{address} comps comparable sales nearby",
+    "{address} sold properties last 6 months",
+    "{address} sold properties last 12 months",
+
+    # Neighborhood-based searches
+    "homes sold near {address} price per square foot",
+    "{suburb_city} recent home sales similar properties",
+    "{suburb_city} property sales comparable to {street_area}",
+    "properties sold {suburb_city} {state_region} recent",
+    "{suburb_city} area home sales last year",
+
+    # Broader geographic searches
+    "similar homes sold {state_region} near {suburb_city}",
+    "{state_region} property sales comparable to {address}",
+    "home sales {suburb_city} {state_region} market data",
+
+    # Development and land value searches
+    "{address} land assembly sales multiple lots",
+    "{address} development site sales large lots",
+    "{suburb_city} development property sales",
+    "land value sales {suburb_city} {state_region}",
+
+    # Property type specific searches
+    "residential sales near {address} comparable",
+    "house sales {suburb_city} similar to {street_area}",
+    "property transactions {suburb_city} recent sales data",
+)
+
+
+# Price history and market intelligence queries, filled in like _COMPS_TEMPLATES
+_PRICE_HISTORY_TEMPLATES = (
+    # Property-specific price history
+    "{address} sale history price changes over time",
+    "{address} property price history previous sales",
+    "{address} historical sale prices trends",
+
+    # Area price trends
+    "{suburb_city} {state_region} property price trends last 5 years",
+    "{suburb_city} median house prices historical data",
+    "{suburb_city} property market trends price growth",
+    "{suburb_city} real estate price appreciation rates",
+
+    # Market velocity and timing
+    "{suburb_city} average days on market properties",
+    "{suburb_city} how long properties take to sell",
+    "{suburb_city} property sale timeframes market velocity",
+
+    # Seasonal trends
+    "{suburb_city} {state_region} seasonal property market trends",
+    "{suburb_city} best time to sell buy property seasonal data",
+    "{suburb_city} property prices by season monthly trends",
+
+    # Market predictions and outlook
+    "{suburb_city} {state_region} property market forecast 2024 2025",
+    "{suburb_city} future property price predictions",
+    "{suburb_city} real estate market outlook growth potential",
+
+    # Economic indicators
+    "{suburb_city} {state_region} population growth property demand",
+    "{suburb_city} economic growth employment property market",
+    "{suburb_city} infrastructure development property values impact",
+)
+
+
+# Market velocity queries, filled in from the area (suburb, or the whole address) and state
+_VELOCITY_TEMPLATES = (
+    "{area} average days on market 2024",
+    "{area} properties selling quickly fast sales",
+    "{area} time to sell property statistics",
+    "{area} market activity property turnover rates",
+    "{area} {state_region} buyer demand property competition",
+    "{area} auction clearance rates success rates",
+    "{area} properties selling above below asking price",
+    "{area} hot property market fast selling homes",
+)
+
+
+# Market competition queries, filled in like _VELOCITY_TEMPLATES
+_COMPETITION_TEMPLATES = (
+    "{area} properties for sale current listings",
+    "{area} property supply demand analysis",
+    "{area} how many homes for sale market inventory",
+    "{area} buyer competition multiple offers",
+    "{area} property stock levels housing supply",
+    "{area} {state_region} seller market buyer market conditions",
+    "{area} property listing price vs sale price analysis",
+    "{area} market conditions tight supply high demand",
+)
+
+
+@dataclass(slots=True, frozen=True)
+class AddressContext:
+    """An address and the location parts the query templates are filled from"""
+    address: str
+    street_area: str    # First comma-separated part, "" if missing
+    suburb_city: str    # Second part, "" if missing
+    state_region: str   # Third part, "" if missing
+    area: str           # suburb_city, or the whole address when it has no suburb
+
+
+@functools.lru_cache(maxsize=1024)
+def address_context(address: str) -> AddressContext:
+    """Split an address into its location parts once; every tool for a request gets
+    the same address, so repeat calls are cache hits."""
+    parts = address.split(',')
+    suburb_city = parts[1].strip() if len(parts) > 1 else ""
+    return AddressContext(
+        address=address,
+        street_area=parts[0].strip(),
+        suburb_city=suburb_city,
+        state_region=parts[2].strip() if len(parts) > 2 else "",
+        area=suburb_city or address
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _queries(templates: tuple[str, ...], ctx: AddressContext) -> tuple[str, ...]:
+    """Fill a template list from an address context, once per (templates, address)"""
+    fields = asdict(ctx)
+    return tuple(template.format_map(fields) for template in templates)
+
+
+def _run_multi_search(
+    address: str, kind: str, top_k: int = 2, ttl_seconds: Optional[float] = None
+) -> str:
+    """Search every QUERY_TEMPLATES[kind] query for an address and join the results"""
+    queries = _queries(QUERY_TEMPLATES[kind], address_context(address))
+    return _multi_search(queries, per_query_limit=top_k, ttl_seconds=ttl_seconds)
+
+
+@functools.lru_cache(maxsize=1)
+def _format_time(epoch_second: int) -> str:
+    """Format a whole second once; repeat calls within that second are a cache hit"""
+    return datetime.fromtimestamp(epoch_second).strftime("%Y-%m-%d %H:%M:%S")
 
 
 def get_current_time() -> str:
     """Get the current date and time"""
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return _format_time(int(time.time()))
 
 
 def get_property_tax_data(address: str) -> str:
     """Get property tax assessment data and history for the given address"""
-    print(f"🔍 Searching property tax data for: {address}")
-    queries = [
-        f"{address} property tax assessment",
-        f"{address} property tax records",
-        f"{address} assessed value tax history"
-    ]
-    all_results = []
-    for query in queries:
-        response = search_client.search(query)
-        all_results.extend([r["content"] for r in response["results"][:2]])
-    return "\n".join(all_results)
+    logger.debug("Searching property tax data for: %s", address)
+    return _run_multi_search(address, "tax", ttl_seconds=_RECORDS_TTL_SECONDS)
 
 
 def get_neighborhood_stats(address: str) -> str:
     """Get neighborhood statistics including median prices and trends"""
-    print(f"📊 Getting neighborhood stats for: {address}")
-    queries = [
-        f"{address} neighborhood median home prices",
-        f"{address} area real estate market trends",
-        f"{address} housing market statistics"
-    ]
-    all_results = []
-    for query in queries:
-        response = search_client.search(query)
-        all_results.extend([r["content"] for r in response["results"][:2]])
-    return "\n".join(all_results)
+    logger.debug("Getting neighborhood stats for: %s", address)
+    return _run_multi_search(address, "neighborhood", ttl_seconds=_MARKET_TTL_SECONDS)
 
 
 def get_school_ratings(address: str) -> str:
     """Get school district ratings and test scores for the area"""
-    print(f"🏫 Getting school ratings for: {address}")
-    queries = [
-        f"{address} school district ratings",
-        f"{address} elementary middle high school scores",
-        f"{address} school quality ratings"
-    ]
-    all_results = []
-    for query in queries:
-        response = search_client.search(query)
-        all_results.extend([r["content"] for r in response["results"][:2]])
-    return "\n".join(all_results)
+    logger.debug("Getting school ratings for: %s", address)
+    return _run_multi_search(address, "schools", ttl_seconds=_RECORDS_TTL_SECONDS)
 
 
 def get_crime_data(address: str) -> str:
     """Get crime statistics for the neighborhood"""
-    print(f"🚔 Getting crime data for: {address}")
-    queries = [
-        f"{address} crime statistics",
-        f"{address} neighborhood safety crime rates",
-        f"{address} area crime data"
-    ]
-    all_results = []
-    for query in queries:
-        response = search_client.search(query)
-        all_results.extend([r["content"] for r in response["results"][:2]])
-    return "\n".join(all_results)
+    logger.debug("Getting crime data for: %s", address)
+    return _run_multi_search(address, "crime", ttl_seconds=_RECORDS_TTL_SECONDS)
 
 
 def get_comparable_sales(address: str) -> str:
     """Get comprehensive comparable sales data with expanded search for more properties"""
-    print(f"🏠 Getting comparable sales for: {address}")
+    logger.debug("Getting comparable sales for: %s", address)
     
-    # Extract location components for targeted searches
-    location_parts = address.split(',')
-    street_area = location_parts[0].strip() if location_parts else address
-    suburb_city = location_parts[1].strip() if len(location_parts) > 1 else ""
-    state_region = location_parts[2].strip() if len(location_parts) > 2 else ""
+    # Comprehensive search queries to capture more properties, targeted by location
+    queries = _queries(_COMPS_TEMPLATES, address_context(address))
     
-    # Comprehensive search queries to capture more properties
-    queries = [
-        # Recent sales - primary searches
-        f"{address} recent sales comparable properties",
-        f"{address} recently sold homes similar properties",
-        f"{address} comps comparable sales nearby",
-        f"{address} sold properties last 6 months",
-        f"{address} sold properties last 12 months",
-        
-        # Neighborhood-based searches
-        f"homes sold near {address} price per square foot",
-        f"{suburb_city} recent home sales similar properties",
-        f"{suburb_city} property sales comparable to {street_area}",
-        f"properties sold {suburb_city} {state_region} recent",
-        f"{suburb_city} area home sales last year",
-        
-        # Broader geographic searches
-        f"similar homes sold {state_region} near {suburb_city}",
-        f"{state_region} property sales comparable to {address}",
-        f"home sales {suburb_city} {state_region} market data",
-        
-        # Development and land value searches
-        f"{address} land assembly sales multiple lots",
-        f"{address} development site sales large lots",
-        f"{suburb_city} development property sales",
-        f"land value sales {suburb_city} {state_region}",
-        
-        # Property type specific searches
-        f"residential sales near {address} comparable",
-        f"house sales {suburb_city} similar to {street_area}",
-        f"property transactions {suburb_city} recent sales data"
-    ]
+    logger.debug("Running %d comprehensive searches", len(queries))
+    # 4 results per query for more comprehensive data
+    results = _multi_search(
+        queries, per_query_limit=4, ttl_seconds=_MARKET_TTL_SECONDS, wave_size=_WAVE_SIZE
+    )
     
-    all_results = []
-    print(f"  🔍 Running {len(queries)} comprehensive searches...")
-    
-    for i, query in enumerate(queries, 1):
-        response = search_client.search(query)
-        # Increased from 2 to 4 results per query for more comprehensive data
-        results = [r["content"] for r in response["results"][:4]]
-        all_results.extend(results)
-        
-        if i % 5 == 0:  # Progress indicator
-            print(f"    ✓ Completed {i}/{len(queries)} searches...")
-    
-    print(f"  ✅ Collected {len(all_results)} comparable sales data points")
-    return "\n".join(all_results)
+    logger.debug("Collected comparable sales data")
+    return results
 
 
 def get_price_history_analysis(address: str) -> str:
     """Get comprehensive price history and market trends for the property and area"""
-    print(f"📈 Analyzing price history and market trends for: {address}")
-    
-    # Extract location components for targeted searches
-    location_parts = address.split(',')
-    street_area = location_parts[0].strip() if location_parts else address
-    suburb_city = location_parts[1].strip() if len(location_parts) > 1 else ""
-    state_region = location_parts[2].strip() if len(location_parts) > 2 else ""
+    logger.debug("Analyzing price history and market trends for: %s", address)
     
-    # Comprehensive market intelligence queries
-    queries = [
-        # Property-specific price history
-        f"{address} sale history price changes over time",
-        f"{address} property price history previous sales",
-        f"{address} historical sale prices trends",
-        
-        # Area price trends
-        f"{suburb_city} {state_region} property price trends last 5 years",
-        f"{suburb_city} median house prices historical data",
-        f"{suburb_city} property market trends price growth",
-        f"{suburb_city} real estate price appreciation rates",
-        
-        # Market velocity and timing
-        f"{suburb_city} average days on market properties",
-        f"{suburb_city} how long properties take to sell",
-        f"{suburb_city} property sale timeframes market velocity",
-        
-        # Seasonal trends
-        f"{suburb_city} {state_region} seasonal property market trends",
-        f"{suburb_city} best time to sell buy property seasonal data",
-        f"{suburb_city} property prices by season monthly trends",
-        
-        # Market predictions and outlook
-        f"{suburb_city} {state_region} property market forecast 2024 2025",
-        f"{suburb_city} future property price predictions",
-        f"{suburb_city} real estate market outlook growth potential",
-        
-        # Economic indicators
-        f"{suburb_city} {state_region} population growth property demand",
-        f"{suburb_city} economic growth employment property market",
-        f"{suburb_city} infrastructure development property values impact"
-    ]
+    # Comprehensive market intelligence queries, targeted by location
+    queries = _queries(_PRICE_HISTORY_TEMPLATES, address_context(address))
     
-    all_results = []
-    print(f"  🔍 Running {len(queries)} market intelligence searches...")
+    logger.debug("Running %d market intelligence searches", len(queries))
+    # 3 results per query for detailed analysis
+    results = _multi_search(
+        queries, per_query_limit=3, ttl_seconds=_MARKET_TTL_SECONDS, wave_size=_WAVE_SIZE
+    )
     
-    for i, query in enumerate(queries, 1):
-        response = search_client.search(query)
-        results = [r["content"] for r in response["results"][:3]]  # 3 results per query for detailed analysis
-        all_results.extend(results)
-        
-        if i % 4 == 0:  # Progress indicator
-            print(f"    ✓ Completed {i}/{len(queries)} market analysis searches...")
-    
-    print(f"  ✅ Collected {len(all_results)} market intelligence data points")
-    return "\n".join(all_results)
+    logger.debug("Collected market intelligence data")
+    return results
 
 
 def get_market_velocity_analysis(address: str) -> str:
     """Get market velocity data - how quickly properties sell in the area"""
-    print(f"⚡ Analyzing market velocity for: {address}")
-    
-    location_parts = address.split(',')
-    suburb_city = location_parts[1].strip() if len(location_parts) > 1 else address
-    state_region = location_parts[2].strip() if len(location_parts) > 2 else ""
+    logger.debug("Analyzing market velocity for: %s", address)
     
-    queries = [
-        f"{suburb_city} average days on market 2024",
-        f"{suburb_city} properties selling quickly fast sales",
-        f"{suburb_city} time to sell property statistics",
-        f"{suburb_city} market activity property turnover rates",
-        f"{suburb_city} {state_region} buyer demand property competition",
-        f"{suburb_city} auction clearance rates success rates",
-        f"{suburb_city} properties selling above below asking price",
-        f"{suburb_city} hot property market fast selling homes"
-    ]
+    queries = _queries(_VELOCITY_TEMPLATES, address_context(address))
     
-    all_results = []
-    for query in queries:
-        response = search_client.search(query)
-        all_results.extend([r["content"] for r in response["results"][:2]])
+    results = _multi_search(queries, ttl_seconds=_MARKET_TTL_SECONDS)
     
-    print(f"  ✅ Collected market velocity data")
-    return "\n".join(all_results)
+    logger.debug("Collected market velocity data")
+    return results
 
 
 def get_market_competition_analysis(address: str) -> str:
     """Analyze current market competition and supply/demand dynamics"""
-    print(f"🎯 Analyzing market competition for: {address}")
+    logger.debug("Analyzing market competition for: %s", address)
     
-    location_parts = address.split(',')
-    suburb_city = location_parts[1].strip() if len(location_parts) > 1 else address
-    state_region = location_parts[2].strip() if len(location_parts) > 2 else ""
+    queries = _queries(_COMPETITION_TEMPLATES, address_context(address))
     
-    queries = [
-        f"{suburb_city} properties for sale current listings",
-        f"{suburb_city} property supply demand analysis",
-        f"{suburb_city} how many homes for sale market inventory",
-        f"{suburb_city} buyer competition multiple offers",
-        f"{suburb_city} property stock levels housing supply",
-        f"{suburb_city} {state_region} seller market buyer market conditions",
-        f"{suburb_city} property listing price vs sale price analysis",
-        f"{suburb_city} market conditions tight supply high demand"
-    ]
+    results = _multi_search(queries, ttl_seconds=_MARKET_TTL_SECONDS)
     
-    all_results = []
-    for query in queries:
-        response = search_client.search(query)
-        all_results.extend([r["content"] for r in response["results"][:2]])
-    
-    print(f"  ✅ Collected market competition data")
-    return "\n".join(all_results)
\ No newline at end of file
+    logger.debug("Collected market competition data")
+    return results
+
+
+# Search-backed tools that need only an address, in the order a full report uses them
+SIGNAL_TOOLS = (
+    get_property_tax_data,
+    get_neighborhood_stats,
+    get_school_ratings,
+    get_crime_data,
+    get_comparable_sales,
+    get_price_history_analysis,
+    get_market_velocity_analysis,
+    get_market_competition_analysis
+)
+
+# Separate from executor.py's pool: agents run there, and waiting on tasks queued
+# behind them in the same pool could deadlock when the pool is saturated
+_SIGNAL_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tool-signals")
+
+
+def _submit_signals(addresses: Iterable[str], tools) -> dict:
+    """Start every (address, tool) pair on the signal pool, {(address, tool name): future}"""
+    # Each task gets a copy of this context, which shares the current search scope's cache dict
+    return {
+        (address, tool.__name__): _SIGNAL_POOL.submit(contextvars.copy_context().run, tool, address)
+        for address in addresses
+        for tool in tools
+    }
+
+
+def prewarm_signals(addresses: Iterable[str], tools=SIGNAL_TOOLS):
+    """Run tools for each address concurrently so an agent's later calls hit the search scope cache.
+    A tool that fails is logged; the agent will run it again itself."""
+    futures = _submit_signals(addresses, tools)
+    wait(futures.values())
+    for (address, name), future in futures.items():
+        if future.exception() is not None:
+            logger.warning("Prewarming %s failed for %s: %s", name, address, future.exception())
+
+
+def prefetch_signals(addresses: Iterable[str], tools) -> list[Future]:
+    """Start tools for each address in the background without waiting on them.
+    Warms the search cache (and joins in-flight searches) ahead of an agent about to
+    call the same tools; cancel the futures once the agent has run to drop any still queued."""
+    return list(_submit_signals(addresses, tools).values())
+
+
+def gather_all_signals(address: str, tools=SIGNAL_TOOLS) -> dict[str, str]:
+    """Run the search tools for an address in one concurrent wave, {tool name: output}.
+    A tool that fails is logged and left out."""
+    results = {}
+    for (_, name), future in _submit_signals([address], tools).items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.warning("%s failed for %s: %s", name, address, e)
+    return results
@@ -8,6 +8,12 @@ import sys
 import asyncio
 from dotenv import load_dotenv
 
+# uvloop's event loop when installed, like the bot itself; None keeps asyncio's default
+try:
+    from uvloop import new_event_loop as _new_event_loop
+except ImportError:
+    _new_event_loop = None
+
 # Load environment variables
 load_dotenv()
 
@@ -56,7 +62,8 @@ def main():
     print("🔐 Telegram Bot Token Validator\n")
     
     try:
-        result = asyncio.run(test_token())
+        with asyncio.Runner(loop_factory=_new_event_loop) as runner:
+            result = runner.run(test_token())
         return 0 if result else 1
     except KeyboardInterrupt:
         print("\n👋 Cancelled by user")
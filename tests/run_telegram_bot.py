@@ -3,14 +3,13 @@
 Entry point to run the Telegram bot for real estate valuations.
 """
 
-import asyncio
 import sys
 import os
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.telegram_bot import main
+from src.telegram_bot import main, run
 
 
 if __name__ == "__main__":
@@ -18,7 +17,7 @@ if __name__ == "__main__":
     print("Press Ctrl+C to stop the bot")
     
     try:
-        asyncio.run(main())
+        run(main())  # On uvloop when installed
     except KeyboardInterrupt:
         print("\n👋 Bot stopped by user")
     except Exception as e:
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Test script for the async agent wrapper without requiring API keys.
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import time
+
+# Add src to path for imports (src modules import each other by bare name)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from async_agent import AsyncRealEstateAgent
+from config import get_cache_config
+from message_parser import PropertyQuery
+
+
+def _make_agent(temp_dir, enable_cache=True, enable_disk=True):
+    """Create an agent with cache settings pointed at a temporary directory"""
+    saved = {k: os.environ.get(k) for k in ('ENABLE_CACHE', 'CACHE_DISK_DIR', 'CACHE_ENABLE_DISK')}
+    os.environ['ENABLE_CACHE'] = 'true' if enable_cache else 'false'
+    os.environ['CACHE_DISK_DIR'] = temp_dir
+    os.environ['CACHE_ENABLE_DISK'] = 'true' if enable_disk else 'false'
+    get_cache_config.cache_clear()  # Config is parsed once; re-read the overrides
+    try:
+        return AsyncRealEstateAgent()
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        get_cache_config.cache_clear()
+
+
+def test_cache_enabled():
+    """Agent should construct its cache when caching is enabled"""
+    print("🧪 Testing Agent Cache Setup...")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        agent = _make_agent(temp_dir)
+        assert agent.cache is not None, "Cache should be created when enabled"
+        print("✅ Cache enabled test passed")
+
+        agent = _make_agent(temp_dir, enable_cache=False)
+        assert agent.cache is None, "Cache should not be created when disabled"
+        assert agent.get_cache_stats() == {"cache_enabled": False}
+        print("✅ Cache disabled test passed")
+
+
+def test_concurrent_queries_share_one_run():
+    """Concurrent identical queries should be served by a single agent run"""
+    print("\n🔗 Testing In-Flight Query Coalescing...")
+
+    calls = []
+
+    async def fake_agent(question, addresses=()):
+        calls.append(question)
+        await asyncio.sleep(0.05)
+        return {'estimate': '$500,000', 'question': question}, False
+
+    async def run():
+        agent._setup_complete = True
+        agent.async_agent = fake_agent
+        query = PropertyQuery(
+            addresses=['123 Main St, City, STATE 12345'],
+            query_type='single',
+            raw_message='What is 123 Main St worth?'
+        )
+        return await asyncio.gather(*[agent.analyze_property(query) for _ in range(3)])
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Memory-only, so no background disk write outlives the temp directory
+        agent = _make_agent(temp_dir, enable_disk=False)
+        results = asyncio.run(run())
+
+        assert len(calls) == 1, "Duplicate queries should share one agent run"
+        assert all(result == results[0] for result in results), "All callers get the same result"
+        assert not agent._inflight, "In-flight map should be empty afterwards"
+        print("✅ Coalescing test passed")
+
+
+def test_failed_estimates_negative_cached():
+    """A failed quick estimate should be served from cache instead of re-running the agent"""
+    print("\n🚫 Testing Negative Result Caching...")
+
+    calls = []
+
+    async def failing_agent(question, addresses=()):
+        calls.append(question)
+        raise RuntimeError("search quota exceeded")
+
+    async def run():
+        agent._setup_complete = True
+        agent.async_agent = failing_agent
+        first = await agent.get_quick_estimate('1 Broken Rd')
+        second = await agent.get_quick_estimate('1 Broken Rd')
+        return first, second
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        agent = _make_agent(temp_dir, enable_disk=False)
+        first, second = asyncio.run(run())
+
+        assert len(calls) == 1, "Repeat failure should not re-run the agent"
+        assert not first['success'] and not second['success']
+        assert second['error'] == "search quota exceeded", "Cached failure keeps its error"
+
+        cache_key = agent.cache._generate_cache_key({'addresses': ['1 Broken Rd'], 'query_type': 'quick'})
+        _, expiry = agent.cache._memory_cache[cache_key]
+        assert expiry - time.monotonic() <= 300, "Negative entries use the short TTL"
+        print("✅ Negative caching test passed")
+
+
+def test_degraded_predictions_cached_briefly():
+    """An answer made while searches were skipped by the circuit breaker gets the short TTL"""
+    print("\n⚡ Testing Degraded Prediction Caching...")
+
+    async def degraded_agent(question, addresses=()):
+        return {'estimate': 'unknown', 'question': question}, True
+
+    async def run():
+        agent._setup_complete = True
+        agent.async_agent = degraded_agent
+        query = PropertyQuery(
+            addresses=['9 Outage Ave, City, STATE 12345'],
+            query_type='single',
+            raw_message='What is 9 Outage Ave worth?'
+        )
+        return await agent.analyze_property(query)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        agent = _make_agent(temp_dir, enable_disk=False)
+        result = asyncio.run(run())
+
+        assert result['estimate'] == 'unknown'
+        cache_key = agent.cache._generate_cache_key(
+            {'addresses': ['9 Outage Ave, City, STATE 12345'], 'query_type': 'single'}
+        )
+        _, expiry = agent.cache._memory_cache[cache_key]
+        assert expiry - time.monotonic() <= 300, "Degraded answers use the short TTL"
+        print("✅ Degraded prediction caching test passed")
+
+
+def test_distinct_queries_batched():
+    """Distinct queries arriving together should be dispatched in one batch"""
+    print("\n📦 Testing Question Batching...")
+
+    from batcher import QuestionBatcher
+
+    batches = []
+    running = 0
+
+    async def fake_run(question):
+        nonlocal running
+        running += 1
+        batches.append(running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if question == 'bad':
+            raise ValueError("boom")
+        return question.upper()
+
+    async def run():
+        batcher = QuestionBatcher(fake_run, window_ms=20, max_batch=8)
+        results = await asyncio.gather(
+            *[batcher.submit(q) for q in ('a', 'b', 'bad', 'c')],
+            return_exceptions=True
+        )
+        assert not batcher._batches, "Finished batches should be released"
+        # close() stops the otherwise never-ending dispatcher
+        worker = batcher._worker
+        batcher.close()
+        await asyncio.wait([worker])
+        assert worker.cancelled()
+        # With no window, questions run straight away without a dispatcher
+        unbatched = QuestionBatcher(fake_run, window_ms=0)
+        assert await unbatched.submit('d') == 'D'
+        assert unbatched._worker is None
+        return results
+
+    results = asyncio.run(run())
+    assert results[:2] == ['A', 'B'] and results[3] == 'C', "Each caller gets its own result"
+    assert isinstance(results[2], ValueError), "Failures are delivered to the failing caller only"
+    assert max(batches) == 4, "Questions in one window should run concurrently"
+    print("✅ Batching test passed")
+
+
+def main():
+    """Run all async agent tests"""
+    print("🚀 Testing Async Agent\n")
+
+    try:
+        test_cache_enabled()
+        test_concurrent_queries_share_one_run()
+        test_failed_estimates_negative_cached()
+        test_degraded_predictions_cached_briefly()
+        test_distinct_queries_batched()
+        print("\n✅ All async agent tests passed!")
+        return 0
+
+    except Exception as e:
+        print(f"\n❌ Async agent test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
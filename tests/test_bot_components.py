@@ -26,8 +26,12 @@ def test_message_parser():
         "289 Gaffney Street, Pascoe Vale, VIC 3044 Australia",
     ]
     
-    for message in test_cases:
-        query = parser.parse_message(message)
+    # One batch keeps every message's LLM call in flight at once
+    queries = parser.parse_messages(test_cases)
+    assert len(queries) == len(test_cases)
+    
+    for message, query in zip(test_cases, queries):
+        assert query.raw_message == message
         print(f"📝 '{message[:40]}...'")
         print(f"   → Addresses: {query.addresses}")
         print(f"   → Type: {query.query_type}")
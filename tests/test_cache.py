@@ -79,22 +79,24 @@ def test_cache_advanced():
             enable_disk_cache=True
         )
         
-        # Test multiple properties
-        for i in range(5):
-            query_data = {
-                'addresses': [f'{100 + i} Test St, City, STATE 12345'],
-                'query_type': 'single'
-            }
-            fake_result = {'estimate': f'${(i+1)*100000}', 'confidence': 0.8}
-            cache.set(query_data, fake_result)
+        # Test multiple properties, written to disk in one batch
+        items = [
+            (
+                {'addresses': [f'{100 + i} Test St, City, STATE 12345'], 'query_type': 'single'},
+                {'estimate': f'${(i+1)*100000}', 'confidence': 0.8}
+            )
+            for i in range(5)
+        ]
+        cache.set_many(items)
         
         # Memory cache should have evicted some entries
         cache_info = cache.get_cache_info()
         assert cache_info['memory_cache']['size'] <= 2, "Should respect memory limit"
         print("✅ Memory eviction test passed")
         
-        # Test disk cache persistence
-        assert cache_info['disk_cache']['size'] > 0, "Should have disk cache entries"
+        # Test disk cache persistence: every batched entry is readable back
+        assert cache_info['disk_cache']['size'] == 5, "Should have all disk cache entries"
+        assert all(cache.get_disk(query_data) == result for query_data, result in items)
         print("✅ Disk cache persistence test passed")
         
         # Test cache clearing
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Test script for the concurrent search fan-out without requiring API keys.
+"""
+
+import asyncio
+import sys
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Add src to path for imports (src modules import each other by bare name)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import search_cache
+from cache_manager import PropertyCache
+from tavily.errors import BadRequestError, UsageLimitExceededError
+
+_DELAY_SECONDS = 0.2
+
+
+class _FakeAsyncClient:
+    """Stands in for AsyncTavilyClient; each search takes _DELAY_SECONDS"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def search(self, query, search_depth="basic", max_results=5):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(_DELAY_SECONDS)
+        finally:
+            self.in_flight -= 1
+        return {"results": [{"content": f"{query} #{i}"} for i in range(max_results)]}
+
+
+class _FailingAsyncClient:
+    """Stands in for an AsyncTavilyClient whose searches all raise error"""
+
+    def __init__(self, error=UsageLimitExceededError("rate limited")):
+        self.error = error
+        self.calls = 0
+
+    async def search(self, query, search_depth="basic", max_results=5):
+        self.calls += 1
+        raise self.error
+
+
+@contextmanager
+def _fake_client(client, cache=None):
+    """Route search_many through a fake client, with the given cache (None disables caching)"""
+    saved = search_cache.get_async_search_client, search_cache._get_cache
+    search_cache.get_async_search_client = lambda: client
+    search_cache._get_cache = lambda: cache
+    try:
+        yield
+    finally:
+        search_cache.get_async_search_client, search_cache._get_cache = saved
+
+
+def test_search_many_runs_concurrently():
+    """Queries should be searched at the same time and returned in query order"""
+    print("🧪 Testing Concurrent Search Fan-out...")
+    client = _FakeAsyncClient()
+    queries = [f"q{i}" for i in range(6)]
+
+    with _fake_client(client):
+        start = time.perf_counter()
+        results = search_cache.search_many(queries, max_results=2)
+        elapsed = time.perf_counter() - start
+
+    assert results == [[f"q{i} #0", f"q{i} #1"] for i in range(6)], results
+    assert client.max_in_flight == len(queries), client.max_in_flight
+    # Serially this would take len(queries) * _DELAY_SECONDS
+    assert elapsed < 3 * _DELAY_SECONDS, elapsed
+    print("✅ Concurrent search fan-out test passed")
+
+
+def test_concurrent_duplicates_coalesced():
+    """The same query searched concurrently should only reach the client once"""
+    print("🧪 Testing In-flight Search Coalescing...")
+    client = _FakeAsyncClient()
+
+    with _fake_client(client):
+        results = search_cache.search_many(["same query", "Same  Query", "other"], max_results=1)
+
+    assert results == [["same query #0"], ["same query #0"], ["other #0"]], results
+    assert client.max_in_flight == 2, client.max_in_flight
+    assert not search_cache._PENDING
+    print("✅ In-flight search coalescing test passed")
+
+
+def test_repeated_searches_hit_cache():
+    """A repeated query, even with different case/spacing, should be served from the cache"""
+    print("🧪 Testing Search Cache Hits...")
+    client = _FakeAsyncClient()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = PropertyCache(disk_cache_dir=temp_dir)
+        with _fake_client(client, cache):
+            first = search_cache.search_many(["Main  St sales"], max_results=2)
+            second = search_cache.search_many(["main st SALES"], max_results=2)
+            info = search_cache.get_cache_info()
+
+    assert first == second, (first, second)
+    assert info["cache_enabled"] is True
+    assert info["statistics"]["hits"] == 1, info["statistics"]
+    assert info["statistics"]["misses"] == 1, info["statistics"]
+    print("✅ Search cache hit test passed")
+
+
+def test_stale_results_served_while_refreshing():
+    """Past its TTL an entry should be returned at once and refreshed in the background"""
+    print("🧪 Testing Stale-While-Revalidate...")
+    client = _FakeAsyncClient()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = PropertyCache(disk_cache_dir=temp_dir)
+        cache_data = {'query': 'suburb prices', 'max_results': 1}
+        cache.set(cache_data, {'contents': ['old'], 'fetched_at': time.time() - 120})
+        with _fake_client(client, cache):
+            start = time.perf_counter()
+            stale = search_cache.search_many(["suburb prices"], max_results=1, ttl_seconds=60)
+            elapsed = time.perf_counter() - start
+            time.sleep(3 * _DELAY_SECONDS)
+            fresh = search_cache.search_many(["suburb prices"], max_results=1, ttl_seconds=60)
+
+    assert stale == [["old"]], stale
+    assert elapsed < _DELAY_SECONDS, elapsed
+    assert fresh == [["suburb prices #0"]], fresh
+    assert not search_cache._REFRESHES
+    print("✅ Stale-while-revalidate test passed")
+
+
+def test_breaker_opens_after_failures():
+    """Failing searches should be retried, then skipped once the circuit opens"""
+    print("🧪 Testing Search Circuit Breaker...")
+    client = _FailingAsyncClient()
+    saved_breaker = search_cache._BREAKER
+    search_cache._BREAKER = search_cache._CircuitBreaker(fail_max=2, reset_seconds=60)
+
+    try:
+        with _fake_client(client):
+            for query in ("first", "second"):
+                try:
+                    search_cache.search_many([query], max_results=1)
+                    assert False, "Expected the rate limit error to propagate"
+                except UsageLimitExceededError:
+                    pass
+            assert client.calls == 6, client.calls  # Three attempts each
+            assert search_cache._BREAKER.state == 'open'
+
+            # Open circuit: no upstream call, empty results instead of an error
+            assert search_cache.search_many(["third", "fourth"], max_results=1) == [[], []]
+            assert client.calls == 6, client.calls
+    finally:
+        search_cache._BREAKER = saved_breaker
+    print("✅ Search circuit breaker test passed")
+
+
+def test_bad_queries_leave_breaker_closed():
+    """Per-query client errors (e.g. an over-long query) must not open the circuit for everyone"""
+    print("🧪 Testing Circuit Breaker Ignores Bad Queries...")
+    client = _FailingAsyncClient(BadRequestError("Query is too long. Max query length is 400 characters."))
+    saved_breaker = search_cache._BREAKER
+    search_cache._BREAKER = search_cache._CircuitBreaker(fail_max=2, reset_seconds=60)
+
+    try:
+        with _fake_client(client):
+            for i in range(6):
+                try:
+                    search_cache.search_many([f"very long query {i}"], max_results=1)
+                    assert False, "Expected the bad request error to propagate"
+                except BadRequestError:
+                    pass
+        assert client.calls == 6, "Client errors are not retried"
+        assert search_cache._BREAKER.state == 'closed'
+        assert search_cache._BREAKER.allow()
+    finally:
+        search_cache._BREAKER = saved_breaker
+    print("✅ Circuit breaker bad query test passed")
+
+
+def test_breaker_recovers_from_lost_trial():
+    """A cancelled or never-reported half-open trial must not leave the circuit stuck"""
+    print("🧪 Testing Circuit Breaker Trial Recovery...")
+    breaker = search_cache._CircuitBreaker(fail_max=1, reset_seconds=0.05)
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == 'half-open'
+    assert not breaker.allow(), "Only one trial at a time"
+    breaker.record_abort()  # Trial cancelled
+    assert breaker.state == 'open' and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()  # New trial, which never reports back
+    time.sleep(0.06)
+    assert breaker.allow(), "A lost trial should time out into a new one"
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+    print("✅ Circuit breaker trial recovery test passed")
+
+
+def main():
+    """Run all search cache tests"""
+    print("🚀 Testing Search Cache\n")
+
+    try:
+        test_search_many_runs_concurrently()
+        test_concurrent_duplicates_coalesced()
+        test_repeated_searches_hit_cache()
+        test_stale_results_served_while_refreshing()
+        test_breaker_opens_after_failures()
+        test_bad_queries_leave_breaker_closed()
+        test_breaker_recovers_from_lost_trial()
+        print("\n✅ All search cache tests passed!")
+        return 0
+
+    except Exception as e:
+        print(f"\n❌ Search cache test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Test script for the search tools' request-scoped cache without requiring API keys.
+"""
+
+import json
+import logging
+import sys
+import os
+from concurrent.futures import wait
+from contextlib import contextmanager
+
+# Add src to path for imports (src modules import each other by bare name)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import tools
+
+
+@contextmanager
+def _fake_search(calls):
+    """Swap the network-backed search functions for ones that record their calls"""
+    def fake_cached_search(query, max_results=5, ttl_seconds=None):
+        calls.append((query, max_results))
+        return [f"{query} #{i}" for i in range(max_results)]
+
+    def fake_search_many(queries, max_results=5, ttl_seconds=None):
+        return [fake_cached_search(q, max_results) for q in queries]
+
+    saved = tools.cached_search, tools.search_many
+    tools.cached_search, tools.search_many = fake_cached_search, fake_search_many
+    try:
+        yield
+    finally:
+        tools.cached_search, tools.search_many = saved
+
+
+def test_search_scope_dedupes_queries():
+    """Repeated queries within one agent run should only be searched once"""
+    print("🧪 Testing Search Scope Dedupe...")
+    calls = []
+
+    def program():
+        tools.web_search("a")
+        tools.web_search("a")
+        return [content for _, content in tools._iter_search(["a", "b", "a"], 2)]
+
+    with _fake_search(calls):
+        results = tools.with_search_scope(program)()
+    # Repeated queries contribute their results once
+    assert results == ["a #0", "a #1", "b #0", "b #1"]
+    # web_search asks for 5 results and the multi-query tools for 2, so "a" is fetched once per size
+    assert calls == [("a", 5), ("a", 2), ("b", 2)], calls
+    print("✅ Search scope dedupe test passed")
+
+
+def test_overlapping_queries_deduped():
+    """Queries differing only in case/whitespace and repeated snippets should be dropped"""
+    print("🧪 Testing Query and Result Dedupe...")
+    calls = []
+
+    with _fake_search(calls):
+        results = [content for _, content in tools._iter_search(["Foo  bar", "foo bar", " FOO BAR "], 2)]
+    assert calls == [("Foo  bar", 2)], calls
+    assert results == ["Foo  bar #0", "Foo  bar #1"]
+    print("✅ Query and result dedupe test passed")
+
+
+def test_multi_search_output_capped():
+    """Tool output should be grouped by query and stop before the snippet that would exceed max_chars"""
+    print("🧪 Testing Tool Output Cap...")
+    calls = []
+    expected_capped = [{"q": "a", "r": ["a #0", "a #1"]}, {"q": "b", "r": ["b #0"]}]
+    max_chars = len(json.dumps(expected_capped, separators=(',', ':')))
+
+    with _fake_search(calls):
+        full = tools._multi_search(["a", "b"])
+        capped = tools._multi_search(["a", "b"], max_chars=max_chars)
+    assert full == '[{"q":"a","r":["a #0","a #1"]},{"q":"b","r":["b #0","b #1"]}]', full
+    assert json.loads(capped) == expected_capped, capped
+    print("✅ Tool output cap test passed")
+
+
+def test_saturated_waves_stop_early():
+    """Once a wave of queries brings back mostly known snippets, later waves are skipped"""
+    print("🧪 Testing Early Search Termination...")
+    waves = []
+
+    def repetitive_search_many(queries, max_results=5, ttl_seconds=None):
+        waves.append(list(queries))
+        # Every query in every wave returns the same pages
+        return [[f"page {i}" for i in range(20)] for _ in queries]
+
+    saved = tools.search_many
+    tools.search_many = repetitive_search_many
+    try:
+        results = [content for _, content in tools._iter_search([f"q{i}" for i in range(20)], 20, wave_size=5)]
+    finally:
+        tools.search_many = saved
+    # The second wave adds nothing new, so the last two waves are never searched
+    assert waves == [[f"q{i}" for i in range(5)], [f"q{i}" for i in range(5, 10)]], waves
+    assert results == [f"page {i}" for i in range(20)]
+    print("✅ Early search termination test passed")
+
+
+def test_search_outside_scope():
+    """Outside a search scope every call goes straight to the search layer"""
+    print("🧪 Testing Search Outside Scope...")
+    calls = []
+
+    with _fake_search(calls):
+        assert tools.web_search("a") == [f"a #{i}" for i in range(5)]
+        tools.web_search("a")
+    assert calls == [("a", 5), ("a", 5)], calls
+    print("✅ Search outside scope test passed")
+
+
+def test_prewarm_fills_search_scope():
+    """Tools run by the prewarm should leave nothing for the agent's own calls to search"""
+    print("🧪 Testing Signal Prewarm...")
+    calls = []
+
+    def program():
+        signals = tools.gather_all_signals("1 Main St", tools=(tools.get_crime_data, tools.get_school_ratings))
+        searched = len(calls)
+        return signals, searched, tools.get_crime_data("1 Main St")
+
+    with _fake_search(calls):
+        signals, searched, crime = tools.with_search_scope(program)()
+    assert set(signals) == {"get_crime_data", "get_school_ratings"}, signals
+    assert crime == signals["get_crime_data"]
+    assert len(calls) == searched == 6, calls
+    print("✅ Signal prewarm test passed")
+
+
+def test_address_context_shared():
+    """Tools for the same address should share one parsed context and query list"""
+    print("🧪 Testing Address Context Sharing...")
+    ctx = tools.address_context("12 Smith St, Richmond, VIC 3121")
+    assert (ctx.street_area, ctx.suburb_city, ctx.state_region) == ("12 Smith St", "Richmond", "VIC 3121")
+    assert ctx.area == "Richmond"
+    assert tools.address_context("5 Oak Ave").area == "5 Oak Ave"
+
+    # Same address, same context object, so the filled query list is memoized too
+    assert tools.address_context("12 Smith St, Richmond, VIC 3121") is ctx
+    queries = tools._queries(tools._VELOCITY_TEMPLATES, ctx)
+    assert tools._queries(tools._VELOCITY_TEMPLATES, ctx) is queries
+    assert queries[0] == "Richmond average days on market 2024", queries[0]
+    print("✅ Address context sharing test passed")
+
+
+def test_prefetch_signals_returns_futures():
+    """Speculative prefetch should start tools in the background and hand back their futures"""
+    print("🧪 Testing Speculative Prefetch...")
+    calls = []
+
+    with _fake_search(calls):
+        futures = tools.prefetch_signals(["1 Elm St, Town"], (tools.get_crime_data,))
+        wait(futures)
+    assert len(futures) == 1
+    assert futures[0].result().startswith('[{"q":"1 Elm St, Town crime statistics"'), futures[0].result()
+    assert len(calls) == len(tools.QUERY_TEMPLATES["crime"]), calls
+    print("✅ Speculative prefetch test passed")
+
+
+def test_skipped_searches_tracked_not_pinned():
+    """Searches skipped by the circuit breaker should be reported and retried within a run"""
+    print("🧪 Testing Skipped Search Tracking...")
+    from search_cache import SkippedSearch
+    calls = []
+    circuit_open = True
+
+    def breaker_search_many(queries, max_results=5, ttl_seconds=None):
+        calls.extend(queries)
+        if circuit_open:
+            return [SkippedSearch() for _ in queries]
+        return [[f"{q} #0"] for q in queries]
+
+    def program():
+        nonlocal circuit_open
+        with tools.track_skipped_searches() as skipped:
+            first = list(tools._iter_search(["a"], 1))
+        circuit_open = False
+        second = list(tools._iter_search(["a"], 1))
+        return skipped.is_set(), first, second
+
+    saved = tools.search_many
+    tools.search_many = breaker_search_many
+    try:
+        skipped, first, second = tools.with_search_scope(program)()
+    finally:
+        tools.search_many = saved
+    assert skipped, "The skipped search should be reported"
+    assert first == [] and second == [("a", "a #0")], (first, second)
+    assert calls == ["a", "a"], "The skipped query is searched again, not served empty from the scope"
+    print("✅ Skipped search tracking test passed")
+
+
+def test_prewarm_failures_logged():
+    """A tool failing during prewarm should be logged rather than silently dropped"""
+    print("🧪 Testing Prewarm Failure Logging...")
+
+    def broken_tool(address):
+        raise RuntimeError("search quota exceeded")
+
+    def working_tool(address):
+        return f"data for {address}"
+
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    tools.logger.addHandler(handler)
+    try:
+        tools.prewarm_signals(["1 Elm St"], (broken_tool, working_tool))
+    finally:
+        tools.logger.removeHandler(handler)
+    messages = [record.getMessage() for record in records]
+    assert messages == ["Prewarming broken_tool failed for 1 Elm St: search quota exceeded"], messages
+    print("✅ Prewarm failure logging test passed")
+
+
+def main():
+    """Run all tools tests"""
+    print("🚀 Testing Search Tools\n")
+
+    try:
+        test_search_scope_dedupes_queries()
+        test_overlapping_queries_deduped()
+        test_multi_search_output_capped()
+        test_saturated_waves_stop_early()
+        test_search_outside_scope()
+        test_prewarm_fills_search_scope()
+        test_address_context_shared()
+        test_prefetch_signals_returns_futures()
+        test_skipped_searches_tracked_not_pinned()
+        test_prewarm_failures_logged()
+        print("\n✅ All tools tests passed!")
+        return 0
+
+    except Exception as e:
+        print(f"\n❌ Tools test failed: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())